@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import torch
+from ai.model_bundle import WEIGHTS_FILE
+from ai.model_loader import weights_fingerprint
+from common.logging import setup_logger
+
+logger = setup_logger()
+
+BERT_BACKEND = os.getenv("BERT_BACKEND", "torch")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH")
+ONNX_OPSET_VERSION = 14
+
+
+class TorchBackend:
+    """eager PyTorch 로 CLS logit 계산."""
+
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model
+        self.model.eval()
+
+    def cls_logits(self, input_ids, attention_mask) -> np.ndarray:
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            return outputs.logits[:, 0, :].cpu().numpy()  # [batch_size, num_labels]
+
+
+class _ClsLogits(torch.nn.Module):
+    """ONNX export 용 래퍼: CLS 위치 logit 만 출력."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits[:, 0, :]
+
+
+def default_onnx_path() -> str:
+    bundle_path = os.getenv("MODEL_BUNDLE_PATH")
+    if bundle_path:
+        return os.path.join(bundle_path, "model.onnx")
+    return f"{os.path.splitext(os.getenv('MODEL_PATH'))[0]}.onnx"
+
+
+def source_weights_path() -> str:
+    """ONNX 파일을 만든 원본 가중치 경로 (번들이면 model.safetensors, 아니면 MODEL_PATH)."""
+    bundle_path = os.getenv("MODEL_BUNDLE_PATH")
+    if bundle_path:
+        return os.path.join(bundle_path, WEIGHTS_FILE)
+    return os.getenv("MODEL_PATH")
+
+
+def _is_quantized(model) -> bool:
+    return any(isinstance(module, torch.ao.nn.quantized.dynamic.Linear) for module in model.modules())
+
+
+def _onnx_is_current(onnx_path: str, fingerprint: str) -> bool:
+    if not os.path.exists(onnx_path):
+        return False
+    try:
+        with open(f"{onnx_path}.source", "r", encoding="utf-8") as f:
+            current = f.read().strip() == fingerprint
+    except OSError:
+        current = False
+    if not current:
+        logger.warning(f"ONNX model {onnx_path} does not match the current weights. Re-exporting.")
+    return current
+
+
+def export_onnx(model, onnx_path: str, fingerprint: str = None):
+    model.eval()
+    dummy = torch.ones((1, 8), dtype=torch.long)
+    # 여러 uvicorn worker 가 동시에 export 해도 서로의 임시 파일을 덮어쓰지 않도록 pid 별 이름 사용
+    tmp_path = f"{onnx_path}.{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            _ClsLogits(model),
+            (dummy, dummy),
+            tmp_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["cls_logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "cls_logits": {0: "batch"},
+            },
+            opset_version=ONNX_OPSET_VERSION,
+        )
+    os.replace(tmp_path, onnx_path)
+    if fingerprint:
+        with open(f"{onnx_path}.source", "w", encoding="utf-8") as f:
+            f.write(fingerprint)
+    logger.info(f"Exported BERT model to ONNX: {onnx_path}")
+
+
+class OnnxBackend:
+    """ONNX Runtime(CPU, 그래프 최적화 적용)으로 CLS logit 계산."""
+
+    name = "onnx"
+
+    def __init__(self, model, onnx_path: str = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("BERT_BACKEND=onnx requires the 'onnxruntime' package.") from e
+
+        if _is_quantized(model):
+            # 동적 양자화 모델은 torch.onnx.export 가 지원하지 않음
+            raise ValueError("BERT_BACKEND=onnx cannot be combined with BERT_QUANTIZE=int8.")
+
+        onnx_path = onnx_path or ONNX_MODEL_PATH or default_onnx_path()
+        # 같은 경로에 새 가중치가 배포되면 원본 식별자가 달라지므로 다시 export
+        weights_path = source_weights_path()
+        fingerprint = weights_fingerprint(weights_path) if weights_path and os.path.exists(weights_path) else None
+        if fingerprint is None:
+            needs_export = not os.path.exists(onnx_path)
+        else:
+            needs_export = not _onnx_is_current(onnx_path, fingerprint)
+        if needs_export:
+            export_onnx(model, onnx_path, fingerprint)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def cls_logits(self, input_ids, attention_mask) -> np.ndarray:
+        return self.session.run(
+            ["cls_logits"],
+            {"input_ids": input_ids.numpy(), "attention_mask": attention_mask.numpy()},
+        )[0]
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def create_backend(model, backend: str = BERT_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown BERT_BACKEND '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](model)
@@ -0,0 +1,144 @@
+"""BERT 추론 벤치마크.
+
+사용법: python -m ai.benchmark [--logs temp_files/logs.txt] [--repeat 5] [--batch-sizes 1,8,32]
+       python -m ai.benchmark --compare-backends torch,onnx
+       python -m ai.benchmark --compare-quantized
+       python -m ai.benchmark --check-tokenizer
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+import torch
+from ai.predict import BERTPredictor
+from ai.backends import TorchBackend, create_backend
+from ai.model_loader import load_tokenizer, quantize_model
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+DEFAULT_LOGS_FILE = os.path.join(PROJECT_ROOT, "temp_files", "logs.txt")
+WINDOW_SIZE = 5
+
+
+def load_logs(file_path, repeat):
+    with open(file_path, "r", encoding="utf-8") as file:
+        logs = json.load(file)
+    return logs * repeat
+
+
+async def prepare_windows(predictor, logs):
+    preprocessed_logs = await predictor.preprocess_logs(logs)
+    return await predictor.sliding_window(preprocessed_logs, WINDOW_SIZE)
+
+
+async def measure(predictor, windowed_logs):
+    start = time.perf_counter()
+    predictions = await predictor.predict(windowed_logs)
+    elapsed = time.perf_counter() - start
+    return predictions, elapsed
+
+
+def model_size_bytes(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def flatten(predictions):
+    return [label for window in predictions for label in window]
+
+
+async def compare_variants(predictor, windowed_logs, variants):
+    """variants: {이름: backend}. 첫 번째 variant 기준으로 라벨 일치율과 처리량 비교."""
+    reference = None
+    for name, backend in variants.items():
+        predictor.backend = backend
+        await measure(predictor, windowed_logs[:1])  # warmup
+
+        predictions, elapsed = await measure(predictor, windowed_logs)
+        labels = flatten(predictions)
+        reference = reference or labels
+        agreement = sum(a == b for a, b in zip(labels, reference)) / max(len(reference), 1)
+        throughput = len(windowed_logs) / elapsed if elapsed else float("inf")
+        print(f"variant={name:<8} elapsed={elapsed:.3f}s windows/s={throughput:.1f} agreement={agreement:.2%}")
+
+
+def check_tokenizer(texts, max_length):
+    """fast / slow tokenizer 의 token id 일치 여부와 인코딩 시간 비교."""
+    encoded = {}
+    for kind in ("slow", "fast"):
+        tokenizer = load_tokenizer(kind)
+        start = time.perf_counter()
+        encoded[kind] = tokenizer(texts, truncation=True, max_length=max_length)['input_ids']
+        print(f"tokenizer={kind:<4} elapsed={time.perf_counter() - start:.3f}s")
+
+    mismatches = [i for i, (slow, fast) in enumerate(zip(encoded["slow"], encoded["fast"])) if slow != fast]
+    print(f"token id match: {len(texts) - len(mismatches)}/{len(texts)}")
+    for i in mismatches[:5]:
+        print(f"  mismatch: {texts[i][:120]}")
+    return not mismatches
+
+
+async def run(args):
+    predictor = BERTPredictor()
+    logs = load_logs(args.logs, args.repeat)
+    windowed_logs = await prepare_windows(predictor, logs)
+    texts = [text for window in windowed_logs for text in window]
+    print(f"logs={len(logs)} windows={len(windowed_logs)} texts={len(texts)} unique_texts={len(set(texts))}")
+
+    unique_texts = list(dict.fromkeys(texts))
+    if args.check_tokenizer:
+        check_tokenizer(unique_texts, predictor.max_length)
+        return
+
+    real_tokens = sum(len(ids) for ids in predictor.tokenizer(
+        unique_texts, truncation=True, max_length=predictor.max_length)['input_ids'])
+    max_length_ratio = 1 - real_tokens / (len(unique_texts) * predictor.max_length)
+    print(f"pad ratio (padding='max_length', {predictor.max_length}): {max_length_ratio:.1%}")
+
+    if args.compare_backends:
+        variants = {name: create_backend(predictor.model, name) for name in args.compare_backends}
+        await compare_variants(predictor, windowed_logs, variants)
+        return
+
+    if args.compare_quantized:
+        quantized = quantize_model(predictor.model)
+        print(f"model size fp32={model_size_bytes(predictor.model) / 2**20:.1f}MiB "
+              f"int8={model_size_bytes(quantized) / 2**20:.1f}MiB")
+        variants = {"fp32": TorchBackend(predictor.model), "int8": TorchBackend(quantized)}
+        await compare_variants(predictor, windowed_logs, variants)
+        return
+
+    baseline = None
+    for batch_size in args.batch_sizes:
+        predictor.batch_size = batch_size
+        await measure(predictor, windowed_logs[:1])  # warmup
+
+        predictor.token_stats = {"tokens": 0, "pad_tokens": 0}
+        predictions, elapsed = await measure(predictor, windowed_logs)
+        throughput = len(windowed_logs) / elapsed if elapsed else float("inf")
+        pad_ratio = predictor.token_stats["pad_tokens"] / max(predictor.token_stats["tokens"], 1)
+        baseline = baseline or throughput
+        print(f"batch_size={batch_size:<4} elapsed={elapsed:.3f}s "
+              f"windows/s={throughput:.1f} speedup={throughput / baseline:.2f}x pad_ratio={pad_ratio:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BERT inference benchmark")
+    parser.add_argument("--logs", default=DEFAULT_LOGS_FILE)
+    parser.add_argument("--repeat", type=int, default=4, help="replay corpus를 몇 번 이어 붙일지")
+    parser.add_argument("--batch-sizes", default="1,8,32",
+                        type=lambda value: [int(v) for v in value.split(",")])
+    parser.add_argument("--compare-backends", default=None, type=lambda value: value.split(","),
+                        help="예: torch,onnx — 첫 번째 backend 대비 라벨 일치율과 처리량 출력")
+    parser.add_argument("--check-tokenizer", action="store_true",
+                        help="replay corpus 에 대해 fast / slow tokenizer 의 token id 가 같은지 확인")
+    parser.add_argument("--compare-quantized", action="store_true",
+                        help="fp32 모델과 int8 동적 양자화 모델의 라벨 일치율, 지연, 크기 비교 (BERT_QUANTIZE 미설정 상태로 실행)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
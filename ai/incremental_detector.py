@@ -0,0 +1,120 @@
+import os
+import numpy as np
+from collections import OrderedDict, deque
+from ai.predict import BERTPredictor
+
+INCREMENTAL_HISTORY = int(os.getenv("INCREMENTAL_HISTORY", "10"))
+INCREMENTAL_MAX_IPS = int(os.getenv("INCREMENTAL_MAX_IPS", "10000"))
+
+
+class _Position:
+    def __init__(self, text: str, benign: bool, num_labels: int):
+        self.text = text                                       # 전처리된 로그 텍스트 (지연 인코딩용)
+        self.benign = benign                                   # allow-list 이벤트 여부
+        self.label_id = None                                   # CLS 예측 라벨 id (인코딩 전이면 None)
+        self.votes = np.zeros(num_labels, dtype=np.int32)      # [num_labels] 투표 벡터
+
+
+class _IPState:
+    def __init__(self, history: int):
+        self.positions = deque(maxlen=history)
+
+
+class IncrementalDetector:
+    """source IP 별 최근 로그의 예측 결과와 투표 행렬을 유지하며 새 로그만 추론.
+
+    새 로그 하나당 인코딩 1회 + 마지막 윈도우(window_size 개 위치)의 투표 갱신만 수행하고,
+    영향받은 위치들의 최종 라벨을 도착 순서대로 반환한다.
+    skip_benign 이면 benign 로그로만 이루어진 윈도우는 인코딩 / 투표 없이 건너뛰고,
+    투표가 하나도 없는 위치는 "No Attack" 으로 본다. (consolidate_predictions 와 동일)
+    """
+
+    def __init__(self, predictor: BERTPredictor, window_size: int = 5,
+                 history: int = INCREMENTAL_HISTORY, max_ips: int = INCREMENTAL_MAX_IPS):
+        self.predictor = predictor
+        self.window_size = window_size
+        self.history = max(history, window_size)
+        self.max_ips = max_ips
+        self.num_labels = len(predictor.label_encoder.classes_)
+        classes = list(predictor.label_encoder.classes_)
+        self.no_attack_id = classes.index("No Attack") if "No Attack" in classes else None
+        self._states = OrderedDict()
+
+    def has_state(self, source_ip: str) -> bool:
+        return source_ip in self._states
+
+    def forget(self, source_ip: str):
+        self._states.pop(source_ip, None)
+
+    def _get_state(self, source_ip: str) -> _IPState:
+        state = self._states.get(source_ip)
+        if state is None:
+            state = self._states[source_ip] = _IPState(self.history)
+            while len(self._states) > self.max_ips:
+                self._states.popitem(last=False)
+        self._states.move_to_end(source_ip)
+        return state
+
+    async def _encode(self, positions: list):
+        if not positions:
+            return
+        encoded = await self.predictor.predict([[position.text] for position in positions])
+        for position, label_id in zip(positions, encoded[:, 0]):
+            position.label_id = int(label_id)
+
+    async def push(self, source_ip: str, logs: list, benign: list = None, skip_benign: bool = False):
+        """logs 를 도착 순서대로 반영. benign[i] 는 i 번째 로그가 allow-list 이벤트인지 여부.
+
+        (labels, skippable, window_label_ids) 를 반환.
+        - labels: 영향받은 위치(새 로그 직전 window_size - 1 개 + 새 로그들)의 최종 라벨,
+          윈도우가 아직 만들어지지 않았으면 []
+        - skippable: 이번에 새로 만들어진 윈도우별로 benign 로그로만 이루어졌는지 여부
+        - window_label_ids: 새 윈도우별 [window_size] 라벨 id, 건너뛴 윈도우는 -1
+        """
+        # 상태는 추론이 성공한 뒤에만 만들거나 갱신 (실패한 push 가 빈 상태를 남기지 않도록)
+        state = self._states.get(source_ip)
+        previous = list(state.positions) if state is not None else []
+        # preprocess_logs 는 순서를 뒤집으므로 도착 순서로 되돌림
+        texts = (await self.predictor.preprocess_logs(logs))[::-1]
+        benign = benign or [False] * len(texts)
+        new_positions = [_Position(text, flag, self.num_labels) for text, flag in zip(texts, benign)]
+
+        context = previous[-(self.window_size - 1):] if self.window_size > 1 else []
+        affected = context + new_positions
+        seen = len(previous)
+
+        # 새 로그마다 그 로그로 끝나는 윈도우 하나가 생김
+        windows, skippable = [], []
+        for end in range(len(context), len(affected)):
+            if seen + end - len(context) + 1 < self.window_size:
+                continue
+            window = affected[end - self.window_size + 1:end + 1]
+            skip = all(position.benign for position in window)
+            skippable.append(skip)
+            if not (skip and skip_benign):
+                windows.append(window)
+
+        # 건너뛰지 않는 윈도우에 속한 위치만 인코딩 (이전에 건너뛰어 인코딩되지 않은 context 위치 포함)
+        pending = {id(position): position for window in windows for position in window if position.label_id is None}
+        await self._encode(list(pending.values()))
+
+        window_label_ids = np.full((len(skippable), self.window_size), -1, dtype=np.int64)
+        scored = iter(windows)
+        for index, skip in enumerate(skippable):
+            if skip and skip_benign:
+                continue
+            window = next(scored)
+            for offset, position in enumerate(window):
+                position.votes[position.label_id] += 1
+                window_label_ids[index, offset] = position.label_id
+
+        self._get_state(source_ip).positions.extend(new_positions)
+        skippable = np.array(skippable, dtype=bool)
+        if seen + len(new_positions) < self.window_size:
+            return [], skippable, window_label_ids
+
+        votes = np.stack([position.votes for position in affected])
+        label_ids = votes.argmax(axis=1)
+        if self.no_attack_id is not None:
+            label_ids[votes.sum(axis=1) == 0] = self.no_attack_id
+        return self.predictor.label_encoder.inverse_transform(label_ids).tolist(), skippable, window_label_ids
@@ -0,0 +1,64 @@
+import os
+import asyncio
+import functools
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from common.logging import setup_logger
+
+logger = setup_logger()
+
+BERT_INFERENCE_WORKERS = int(os.getenv("BERT_INFERENCE_WORKERS", "1"))
+BERT_NUM_THREADS = int(os.getenv("BERT_NUM_THREADS", "0"))  # 0 이면 torch 기본값 유지
+BERT_MAX_PENDING = int(os.getenv("BERT_MAX_PENDING", "8"))
+BERT_SUBMIT_TIMEOUT = float(os.getenv("BERT_SUBMIT_TIMEOUT", "30"))
+
+
+class InferenceQueueFullError(Exception):
+    """추론 대기열이 가득 차 작업을 제출하지 못함."""
+    pass
+
+
+class InferencePool:
+    """torch forward pass 를 이벤트 루프 밖의 전용 스레드에서 실행하는 풀."""
+
+    def __init__(self, workers: int = BERT_INFERENCE_WORKERS, max_pending: int = BERT_MAX_PENDING,
+                 submit_timeout: float = BERT_SUBMIT_TIMEOUT, num_threads: int = BERT_NUM_THREADS):
+        if num_threads > 0:
+            # intra-op 스레드 수는 프로세스 전역 설정 (uvicorn 워커 수 x 스레드 수 <= 코어 수 권장)
+            torch.set_num_threads(num_threads)
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.submit_timeout = submit_timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bert-inference")
+        self.pending = 0
+        self._slots = None
+
+    async def run(self, func, *args, **kwargs):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.submit_timeout)
+        except asyncio.TimeoutError:
+            raise InferenceQueueFullError(
+                f"Inference queue is full ({self.max_pending} pending) for {self.submit_timeout}s."
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self._slots.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "num_threads": torch.get_num_threads(),
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+        }
@@ -0,0 +1,66 @@
+"""오프라인 단일 디렉터리 모델 번들.
+
+번들 구성:
+    config.json          BertConfig
+    vocab.txt 외         tokenizer 파일 (tokenizer.save_pretrained)
+    model.safetensors    fine-tuned 가중치
+    label_classes.json   LabelEncoder.classes_
+
+생성: python -m ai.model_bundle <output_dir>   (MODEL_PATH, LABEL_ENCODER_PATH 필요)
+사용: MODEL_BUNDLE_PATH=<output_dir>
+"""
+import os
+import sys
+import json
+import numpy as np
+from safetensors.torch import load_file, save_file
+from sklearn.preprocessing import LabelEncoder
+from transformers import BertConfig, BertForTokenClassification
+from transformers.modeling_utils import no_init_weights
+
+CONFIG_FILE = "config.json"
+WEIGHTS_FILE = "model.safetensors"
+LABEL_CLASSES_FILE = "label_classes.json"
+
+
+def save_bundle(bundle_dir: str, model, tokenizer, label_encoder):
+    os.makedirs(bundle_dir, exist_ok=True)
+    model.config.save_pretrained(bundle_dir)
+    tokenizer.save_pretrained(bundle_dir)
+    state_dict = {name: tensor.contiguous() for name, tensor in model.state_dict().items()}
+    save_file(state_dict, os.path.join(bundle_dir, WEIGHTS_FILE), metadata={"format": "pt"})
+    with open(os.path.join(bundle_dir, LABEL_CLASSES_FILE), "w", encoding="utf-8") as f:
+        json.dump([str(label) for label in label_encoder.classes_], f, ensure_ascii=False, indent=2)
+
+
+def load_bundle(bundle_dir: str, tokenizer_class):
+    """네트워크 없이 로컬 번들에서 모델을 적재. 가중치는 safetensors mmap 으로 한 번만 materialize."""
+    config = BertConfig.from_pretrained(bundle_dir, local_files_only=True)
+    tokenizer = tokenizer_class.from_pretrained(bundle_dir, local_files_only=True)
+
+    # 랜덤 초기화를 건너뛰고 골격만 만든 뒤 mmap 된 텐서를 그대로 파라미터로 할당
+    with no_init_weights():
+        model = BertForTokenClassification(config)
+    model.load_state_dict(load_file(os.path.join(bundle_dir, WEIGHTS_FILE)), assign=True)
+    model.eval()
+
+    with open(os.path.join(bundle_dir, LABEL_CLASSES_FILE), "r", encoding="utf-8") as f:
+        label_encoder = LabelEncoder()
+        label_encoder.classes_ = np.array(json.load(f))
+
+    return model, tokenizer, label_encoder
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("usage: python -m ai.model_bundle <output_dir>")
+        sys.exit(1)
+
+    from ai.model_loader import load_model
+    model, tokenizer, label_encoder = load_model(quantize="")
+    save_bundle(sys.argv[1], model, tokenizer, label_encoder)
+    print(f"Model bundle written to {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,78 @@ import os
 import torch
 import pickle
 from dotenv import load_dotenv
-from transformers import BertTokenizer, BertForTokenClassification
+from transformers import BertTokenizer, BertTokenizerFast, BertForTokenClassification
+from ai.model_bundle import WEIGHTS_FILE, load_bundle
+from common.logging import setup_logger
 
 load_dotenv()
+logger = setup_logger()
 
+BERT_QUANTIZE = os.getenv("BERT_QUANTIZE", "")  # "int8" 이면 동적 양자화 모델 사용
+BERT_TOKENIZER = os.getenv("BERT_TOKENIZER", "fast")  # "slow" 이면 기존 파이썬 BertTokenizer 사용
+
+TOKENIZER_CLASSES = {
+    "fast": BertTokenizerFast,
+    "slow": BertTokenizer,
+}
+
+
+def load_tokenizer(kind: str = BERT_TOKENIZER):
+    if kind not in TOKENIZER_CLASSES:
+        raise ValueError(f"Unsupported BERT_TOKENIZER value '{kind}'. Choose one of: {', '.join(TOKENIZER_CLASSES)}")
+    return TOKENIZER_CLASSES[kind].from_pretrained('bert-base-uncased')
+
+
+QUANTIZED_WEIGHTS_FILE = "model.int8.pt"
+
+
+def weights_fingerprint(path: str) -> str:
+    """원본 가중치 파일 식별자 (크기 + 수정 시각). 같은 경로에 새 가중치가 배포되면 달라짐."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def quantize_model(model, cache_path: str = None, source_path: str = None):
+    """Linear 레이어를 int8 로 동적 양자화. cache_path 가 있으면 원본 가중치 식별자와 함께 저장."""
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if cache_path:
+        try:
+            torch.save({"source": weights_fingerprint(source_path), "state_dict": quantized.state_dict()}, cache_path)
+            logger.info(f"Cached int8 quantized model: {cache_path}")
+        except OSError as e:
+            logger.warning(f"Failed to cache int8 quantized model at {cache_path}: {e}")
+    return quantized
+
+
+def load_quantized_cache(model, cache_path: str, source_path: str):
+    """cache_path 가 source_path 의 현재 가중치로 만들어졌으면 양자화 모델을 반환, 아니면 None."""
+    if not os.path.exists(cache_path):
+        return None
+
+    cached = torch.load(cache_path, map_location=torch.device('cpu'))
+    if not isinstance(cached, dict) or cached.get("source") != weights_fingerprint(source_path):
+        logger.warning(f"Int8 cache {cache_path} does not match {source_path}. Re-quantizing.")
+        return None
+
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    quantized.load_state_dict(cached["state_dict"])
+    return quantized
+
+
+def load_model(quantize: str = BERT_QUANTIZE):
+    if quantize not in ("", "int8"):
+        raise ValueError(f"Unsupported BERT_QUANTIZE value '{quantize}'. Use 'int8' or leave it empty.")
+
+    bundle_path = os.getenv("MODEL_BUNDLE_PATH")
+    if bundle_path:
+        model, tokenizer, label_encoder = load_bundle(bundle_path, TOKENIZER_CLASSES[BERT_TOKENIZER])
+        if quantize == "int8":
+            quantized_path = os.getenv("QUANTIZED_MODEL_PATH") or os.path.join(bundle_path, QUANTIZED_WEIGHTS_FILE)
+            weights_path = os.path.join(bundle_path, WEIGHTS_FILE)
+            quantized = load_quantized_cache(model, quantized_path, weights_path)
+            model = quantized if quantized is not None else quantize_model(model, quantized_path, weights_path)
+        return model, tokenizer, label_encoder
 
-def load_model():
     model_path = os.getenv("MODEL_PATH")
     label_encoder_path = os.getenv("LABEL_ENCODER_PATH")
 
@@ -15,8 +81,18 @@ def load_model():
         label_encoder = pickle.load(f)
 
     unique_labels = len(label_encoder.classes_)
-    tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
+    tokenizer = load_tokenizer()
     model = BertForTokenClassification.from_pretrained('bert-base-uncased', num_labels=unique_labels)
-    model.load_state_dict(torch.load(model_path, map_location=torch.device('cpu')))
-    
+
+    if quantize == "int8":
+        quantized_path = os.getenv("QUANTIZED_MODEL_PATH") or f"{os.path.splitext(model_path)[0]}.int8.pt"
+        # 캐시가 현재 MODEL_PATH 가중치로 만들어졌으면 fp32 가중치를 다시 읽지 않고 양자화된 가중치만 적재
+        quantized = load_quantized_cache(model, quantized_path, model_path)
+        if quantized is None:
+            model.load_state_dict(torch.load(model_path, map_location=torch.device('cpu')))
+            quantized = quantize_model(model, quantized_path, model_path)
+        model = quantized
+    else:
+        model.load_state_dict(torch.load(model_path, map_location=torch.device('cpu')))
+
     return model, tokenizer, label_encoder
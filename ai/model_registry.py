@@ -0,0 +1,155 @@
+import os
+import time
+import random
+import resource
+from datetime import datetime, timezone
+from fastapi import HTTPException, Request
+from ai.predict import BERTPredictor
+from ai.inference_pool import InferencePool
+from ai.incremental_detector import IncrementalDetector
+from common.logging import setup_logger
+
+logger = setup_logger()
+
+BERT_WARMUP_ROUNDS = int(os.getenv("BERT_WARMUP_ROUNDS", "2"))  # 0 이면 warmup 생략
+BERT_WARMUP_LOGS = int(os.getenv("BERT_WARMUP_LOGS", "20"))
+
+WARMUP_EVENTS = [
+    ("sts.amazonaws.com", "GetCallerIdentity", True),
+    ("iam.amazonaws.com", "ListUsers", True),
+    ("iam.amazonaws.com", "AttachUserPolicy", False),
+    ("ec2.amazonaws.com", "DescribeInstances", True),
+    ("s3.amazonaws.com", "ListBuckets", True),
+    ("s3.amazonaws.com", "PutBucketPolicy", False),
+]
+
+
+def get_rss_bytes() -> int:
+    """현재 프로세스의 상주 메모리(RSS) 크기."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # /proc 이 없는 환경에서는 최대 RSS 로 대체 (Linux: KB 단위)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def synthetic_cloudtrail_logs(count: int) -> list:
+    """warmup 용 가짜 CloudTrail 레코드. 길이가 제각각이어야 여러 batch shape 이 미리 실행됨."""
+    rng = random.Random(0)
+    logs = []
+    for i in range(count):
+        event_source, event_name, read_only = WARMUP_EVENTS[i % len(WARMUP_EVENTS)]
+        logs.append({
+            "eventTime": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+            "eventSource": event_source,
+            "eventName": event_name,
+            "readOnly": read_only,
+            "eventType": "AwsApiCall",
+            "eventCategory": "Management",
+            "managementEvent": True,
+            "userIdentity": {"type": "IAMUser", "accessKeyId": "AKIAWARMUP"},
+            "resources": [{"ARN": f"arn:aws:iam::000000000000:user/warmup-{j}"} for j in range(rng.randint(0, 12))],
+        })
+    return logs
+
+
+class ModelRegistry:
+    """워커 프로세스당 한 번만 BERT 모델을 적재해 공유하는 레지스트리."""
+
+    def __init__(self):
+        self.predictor = None
+        self.inference_pool = None
+        self.incremental_detector = None
+        self.load_seconds = None
+        self.rss_before_load = None
+        self.rss_after_load = None
+        self.loaded_at = None
+        self.load_count = 0
+        self.warmup_seconds = None
+        self.ready = False
+
+    def load(self, prediction_cache=None) -> BERTPredictor:
+        if self.predictor is not None:
+            return self.predictor
+
+        self.rss_before_load = get_rss_bytes()
+        start = time.perf_counter()
+
+        self.inference_pool = InferencePool()
+        self.predictor = BERTPredictor(inference_pool=self.inference_pool, prediction_cache=prediction_cache)
+        self.incremental_detector = IncrementalDetector(self.predictor)
+
+        self.load_seconds = time.perf_counter() - start
+        self.rss_after_load = get_rss_bytes()
+        self.loaded_at = datetime.now(timezone.utc)
+        self.load_count += 1
+        logger.info(
+            f"BERT model loaded in {self.load_seconds:.2f}s "
+            f"(pid={os.getpid()}, rss={self.rss_after_load / 2**20:.1f}MiB, "
+            f"delta={(self.rss_after_load - self.rss_before_load) / 2**20:.1f}MiB)"
+        )
+        return self.predictor
+
+    async def warmup(self, rounds: int = BERT_WARMUP_ROUNDS, num_logs: int = BERT_WARMUP_LOGS):
+        """합성 로그로 추론 경로 전체를 미리 실행. 끝나야 readiness 가 ready 로 바뀜."""
+        if self.predictor is None:
+            logger.error("BERT warmup skipped: model is not loaded.")
+            return
+
+        try:
+            start = time.perf_counter()
+            logs = synthetic_cloudtrail_logs(num_logs)
+            for _ in range(rounds):
+                preprocessed_logs = await self.predictor.preprocess_logs(logs)
+                windowed_logs = await self.predictor.sliding_window(preprocessed_logs)
+                predictions = await self.predictor.predict(windowed_logs, use_cache=False)
+                await self.predictor.consolidate_predictions(predictions, len(preprocessed_logs), 5)
+            self.warmup_seconds = time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"BERT warmup failed: {e}")
+            return
+
+        self.ready = True
+        logger.info(f"metric=bert_warmup_seconds value={self.warmup_seconds:.3f} rounds={rounds} pid={os.getpid()}")
+
+    def close(self):
+        self.ready = False
+        if self.inference_pool is not None:
+            self.inference_pool.shutdown()
+            self.inference_pool = None
+        self.incremental_detector = None
+        self.predictor = None
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "loaded": self.predictor is not None,
+            "ready": self.ready,
+            "load_count": self.load_count,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "warmup_seconds": self.warmup_seconds,
+            "rss_bytes": get_rss_bytes(),
+            "model_rss_bytes": (self.rss_after_load - self.rss_before_load) if self.rss_after_load is not None else None,
+            "inference_pool": self.inference_pool.stats() if self.inference_pool is not None else None,
+        }
+
+
+def get_model_registry(request: Request) -> ModelRegistry:
+    return request.app.state.model_registry
+
+
+def get_bert_predictor(request: Request) -> BERTPredictor:
+    predictor = request.app.state.model_registry.predictor
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="BERT model is not loaded.")
+    return predictor
+
+
+def get_incremental_detector(request: Request) -> IncrementalDetector:
+    detector = request.app.state.model_registry.incremental_detector
+    if detector is None:
+        raise HTTPException(status_code=503, detail="BERT model is not loaded.")
+    return detector
@@ -1,11 +1,33 @@
+import os
+import copy
+import threading
 from ai.model_loader import load_model
+from ai.backends import BERT_BACKEND, create_backend
 from transformers import BertTokenizer, BertForTokenClassification
-import torch
-from collections import Counter
+import numpy as np
+
+BERT_BATCH_SIZE = int(os.getenv("BERT_BATCH_SIZE", "32"))
+BERT_MAX_LENGTH = int(os.getenv("BERT_MAX_LENGTH", "512"))
 
 class BERTPredictor:
-    def __init__(self):
+    def __init__(self, batch_size: int = BERT_BATCH_SIZE, max_length: int = BERT_MAX_LENGTH, inference_pool=None,
+                 backend: str = BERT_BACKEND, prediction_cache=None):
         self.model, self.tokenizer, self.label_encoder = load_model()
+        self.backend = create_backend(self.model, backend)
+        self.inference_pool = inference_pool
+        self.prediction_cache = prediction_cache
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.token_stats = {"tokens": 0, "pad_tokens": 0}
+        self._token_stats_lock = threading.Lock()
+        # fast tokenizer 는 동시 호출 시 "Already borrowed" 가 나므로 추론 스레드마다 사본을 사용
+        self._thread_local = threading.local()
+
+    def _thread_tokenizer(self):
+        tokenizer = getattr(self._thread_local, "tokenizer", None)
+        if tokenizer is None:
+            tokenizer = self._thread_local.tokenizer = copy.deepcopy(self.tokenizer)
+        return tokenizer
 
     async def preprocess_logs(self, data):
         preprocessed_data = []
@@ -42,45 +64,85 @@ class BERTPredictor:
 
         return windowed_logs
     
-    async def consolidate_predictions(self, predictions, num_logs, window_size):
-
-        log_votes = [Counter() for _ in range(num_logs)]
-
-        for i, window_pred in enumerate(predictions):
-            for j, label in enumerate(window_pred):
-                log_index = i + j
-                if log_index < num_logs:
-                    log_votes[log_index][label] += 1
-        
-        final_labels = []
-        for votes in log_votes:
-            if votes:
-                final_labels.append(votes.most_common(1)[0][0])
-            else:
-                final_labels.append("No Attack") 
-        return final_labels
-
-    async def predict(self,windowed_logs):
-        self.model.eval()
-        predictions = []
-
-        for input_text in windowed_logs:
-            inputs = self.tokenizer(
-                input_text,
-                padding='max_length',
-                truncation=True,
-                return_tensors='pt',
-                max_length=512
+    async def consolidate_predictions(self, predictions, num_logs, window_size, window_starts=None):
+        """윈도우별 라벨 id 행렬 [num_windows, window_size] 를 로그별 다수결로 합산 후 한 번만 디코딩.
+
+        window_starts 가 주어지면 i 번째 행은 window_starts[i] 번째 로그부터 시작하는 윈도우.
+        투표가 하나도 없는 로그는 "No Attack".
+        """
+        predictions = np.asarray(predictions, dtype=np.int64)
+        votes = np.zeros((num_logs, len(self.label_encoder.classes_)), dtype=np.int32)
+
+        if predictions.size:
+            if window_starts is None:
+                window_starts = np.arange(predictions.shape[0])
+            log_index = np.asarray(window_starts)[:, None] + np.arange(predictions.shape[1])[None, :]
+            valid = log_index < num_logs
+            np.add.at(votes, (log_index[valid], predictions[valid]), 1)
+
+        final_labels = self.label_encoder.inverse_transform(votes.argmax(axis=1)).astype(object)
+        final_labels[votes.sum(axis=1) == 0] = "No Attack"
+        return final_labels.tolist()
+
+    def _bucketed_batches(self, token_ids):
+        """토큰 길이순으로 정렬해 비슷한 길이끼리 batch_size 단위로 묶음."""
+        order = sorted(range(len(token_ids)), key=lambda i: len(token_ids[i]))
+        return [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+
+    def _predict_label_ids(self, texts):
+        """로그 텍스트를 길이별 batch 로 묶어 batch 내 최장 길이까지만 padding 후 추론."""
+        label_ids = np.empty(len(texts), dtype=np.int64)
+        if not texts:
+            return label_ids
+
+        tokenizer = self._thread_tokenizer()
+        token_ids = tokenizer(list(texts), truncation=True, max_length=self.max_length)['input_ids']
+        for batch_index in self._bucketed_batches(token_ids):
+            inputs = tokenizer.pad(
+                {'input_ids': [token_ids[i] for i in batch_index]},
+                padding='longest',
+                return_tensors='pt'
             )
-            input_ids = inputs['input_ids']
             attention_mask = inputs['attention_mask']
-            with torch.no_grad():
-                outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
-                logits = outputs.logits[:, 0, :] # [batch_size, sequence_length, num_labels]
-
-                # 토큰 단위로 예측 수행
-                predicted_labels = torch.argmax(logits, dim=-1)  # [batch_size, sequence_length]
-                decoded_predictions = self.label_encoder.inverse_transform(predicted_labels.cpu().numpy().flatten())
-                predictions.append(decoded_predictions)
-        
-        return predictions
\ No newline at end of file
+            with self._token_stats_lock:
+                self.token_stats["tokens"] += attention_mask.numel()
+                self.token_stats["pad_tokens"] += attention_mask.numel() - int(attention_mask.sum())
+
+            logits = self.backend.cls_logits(inputs['input_ids'], attention_mask)  # [batch_size, num_labels] (CLS 토큰)
+            label_ids[batch_index] = np.argmax(logits, axis=-1)
+
+        return label_ids
+
+    async def _infer_label_ids(self, texts):
+        if self.inference_pool is not None:
+            # forward pass 가 이벤트 루프를 막지 않도록 전용 스레드에서 실행
+            return await self.inference_pool.run(self._predict_label_ids, texts)
+        return self._predict_label_ids(texts)
+
+    async def predict(self, windowed_logs, use_cache: bool = True):
+        texts = [text for window in windowed_logs for text in window]
+        if not texts:
+            return np.empty((0, 0), dtype=np.int64)
+
+        # 같은 로그는 여러 윈도우에 겹쳐 들어가지만 CLS 결과는 로그마다 동일하므로 한 번만 인코딩
+        unique_positions = {}
+        text_index = np.array([unique_positions.setdefault(text, len(unique_positions)) for text in texts])
+        unique_texts = list(unique_positions)
+
+        # 토큰화 전에 캐시 확인 후 없는 텍스트만 추론
+        cache = self.prediction_cache if use_cache else None
+        cached = await cache.get_many(unique_texts) if cache is not None else {}
+        label_ids = np.empty(len(unique_texts), dtype=np.int64)
+        for i, label_id in cached.items():
+            label_ids[i] = label_id
+
+        missing = [i for i in range(len(unique_texts)) if i not in cached]
+        if missing:
+            missing_texts = [unique_texts[i] for i in missing]
+            missing_ids = await self._infer_label_ids(missing_texts)
+            label_ids[missing] = missing_ids
+            if cache is not None:
+                await cache.set_many(missing_texts, missing_ids)
+
+        # 라벨 id 행렬 [num_windows, window_size] 로 반환 (디코딩은 consolidate_predictions 에서 한 번만)
+        return label_ids[text_index].reshape(len(windowed_logs), -1)
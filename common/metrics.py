@@ -0,0 +1,39 @@
+import time
+from collections import defaultdict
+
+
+class Metrics:
+    """프로세스 내 카운터 / 게이지 / 처리 시간 집계."""
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.timings = {}
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        timing = self.timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+        timing["last"] = seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "timestamp": time.time(),
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "timings": {
+                name: {**timing, "avg": timing["total"] / timing["count"] if timing["count"] else 0.0}
+                for name, timing in self.timings.items()
+            },
+        }
+
+
+# 싱글턴 인스턴스 생성
+metrics = Metrics()
@@ -1,7 +1,8 @@
 import os
 import json
+import time
 import asyncio
-from typing import Optional, List, Dict, Any, Callable
+from typing import Optional, List, Dict, Any, Callable, Tuple, AsyncIterator
 import redis.asyncio as redis
 from dotenv import load_dotenv
 from common.logging import setup_logger
@@ -18,11 +19,35 @@ if not REDIS_HOST or not REDIS_PORT:
 REDIS_KEY_PREFIX = {
     'LOGS': 'namespace:logs',
     'PROCESSED': 'namespace:processed',
-    'PREDICTION': 'namespace:prediction'
+    'PREDICTION': 'namespace:prediction',
+    'STREAM': 'namespace:stream',
+    'LOCK': 'namespace:lock',
+    'CHANNEL': 'namespace:channel',
+    'CHECKPOINT': 'namespace:checkpoint',
+    'SEQUENCE': 'namespace:sequence',
+    'MEMBERS': 'namespace:members'
 }
 MAX_RETRY_ATTEMPTS = 3
+LOG_QUEUE_MAX_LOGS = 10
+PROCESSED_CACHE_POSITIVE_TTL = float(os.getenv("PROCESSED_CACHE_POSITIVE_TTL", "30"))
+PROCESSED_CACHE_NEGATIVE_TTL = float(os.getenv("PROCESSED_CACHE_NEGATIVE_TTL", "5"))
+PROCESSED_CACHE_MAX_SIZE = 10000
 RETRY_DELAY = 1
 
+# 소유자가 일치할 때만 lease 를 연장 / 해제
+RENEW_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 
 class RedisDriverError(Exception):
     """Redis 드라이버 오류."""
@@ -43,6 +68,7 @@ class RedisDriver:
     def __init__(self):
         self.redis_url = f'redis://{REDIS_HOST}:{REDIS_PORT}'
         self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
+        self._processed_cache = {}  # source_ip -> (처리 여부, 만료 시각)
 
     async def connect(self):
         """Redis 연결 확인."""
@@ -68,32 +94,53 @@ class RedisDriver:
                     await asyncio.sleep(RETRY_DELAY * (2 ** attempt))
         raise RedisOperationError(f"Redis operation failed after {MAX_RETRY_ATTEMPTS} attempts.")
 
-    async def set_log_queue(self, source_ip: str, log_data: dict, ttl: int = 2400) -> None:
+    async def set_log_queue(self, source_ip: str, log_data: dict, ttl: int = 2400, max_logs: int = LOG_QUEUE_MAX_LOGS) -> None:
         """Redis 로그 큐에 로그 추가."""
-        key = f"{REDIS_KEY_PREFIX['LOGS']}:{source_ip}"
-
-        async def _set_operation():
-            await self.redis_client.rpush(key, json.dumps(log_data))
-            if not await self.redis_client.ttl(key):
-                await self.redis_client.expire(key, ttl)
-
-        await self._execute_with_retry(_set_operation)
+        await self.push_log_queue(source_ip, log_data, ttl=ttl, max_logs=max_logs)
 
-    async def get_log_queue(self, source_ip: str, max_logs: int = 10, ttl: int = 2400) -> List[Dict]:
+    async def get_log_queue(self, source_ip: str, max_logs: int = LOG_QUEUE_MAX_LOGS, ttl: int = 2400) -> List[Dict]:
         """Redis 로그 큐에서 로그 가져오기."""
         key = f"{REDIS_KEY_PREFIX['LOGS']}:{source_ip}"
 
         async def _get_operation():
-            logs = await self.redis_client.lrange(key, 0, 10)
-            result = [json.loads(log) for log in logs]
-
-            if len(result) >= 5:
-                for i in range(len(result) - 5):
-                    await self.redis_client.lpop(key)
-                return result
+            logs = await self.redis_client.lrange(key, -max_logs, -1)
+            return [json.loads(log) for log in logs]
 
         return await self._execute_with_retry(_get_operation)
 
+    async def push_log_queue(self, source_ip: str, log_data: dict, ttl: int = 2400, max_logs: int = LOG_QUEUE_MAX_LOGS) -> List[Dict]:
+        """로그 추가, 최근 max_logs 개로 LTRIM, TTL 설정 후 큐 전체를 한 번의 왕복으로 반환."""
+        windows = await self.push_log_queues([(source_ip, log_data)], ttl=ttl, max_logs=max_logs)
+        return windows[source_ip]
+
+    async def push_log_queues(self, entries: List[Tuple[str, dict]], ttl: int = 2400,
+                              max_logs: int = LOG_QUEUE_MAX_LOGS) -> Dict[str, List[Dict]]:
+        """한 poll 의 (source_ip, 로그) 목록을 하나의 파이프라인으로 큐에 넣고 IP 별 최근 로그 윈도우 반환."""
+        if not entries:
+            return {}
+
+        grouped = {}
+        for source_ip, log_data in entries:
+            grouped.setdefault(source_ip, []).append(json.dumps(log_data))
+
+        async def _push_operation():
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                for source_ip, logs in grouped.items():
+                    key = f"{REDIS_KEY_PREFIX['LOGS']}:{source_ip}"
+                    pipe.rpush(key, *logs)
+                    pipe.ltrim(key, -max_logs, -1)
+                    pipe.expire(key, ttl, nx=True)
+                    pipe.lrange(key, 0, -1)
+                results = await pipe.execute()
+
+            # IP 당 명령 4개 (RPUSH, LTRIM, EXPIRE, LRANGE) 중 LRANGE 결과만 사용
+            return {
+                source_ip: [json.loads(log) for log in results[i * 4 + 3]]
+                for i, source_ip in enumerate(grouped)
+            }
+
+        return await self._execute_with_retry(_push_operation)
+
     async def mark_as_processed(self, source_ip: str, is_attack: bool = False) -> None:
         """로그 처리 표시."""
         key = f"{REDIS_KEY_PREFIX['PROCESSED']}:{source_ip}"
@@ -102,10 +149,256 @@ class RedisDriver:
             await self.redis_client.set(key, "true", ex=(None if is_attack else 3600))
 
         await self._execute_with_retry(_mark_operation)
+        self._cache_processed(source_ip, True)
 
     async def is_processed(self, source_ip: str) -> bool:
         """로그가 이미 처리되었는지 확인."""
-        key = f"{REDIS_KEY_PREFIX['PROCESSED']}:{source_ip}"
+        return source_ip in await self.get_processed_ips([source_ip])
+
+    def _cache_processed(self, source_ip: str, processed: bool):
+        now = time.monotonic()
+        if len(self._processed_cache) >= PROCESSED_CACHE_MAX_SIZE:
+            self._processed_cache = {ip: entry for ip, entry in self._processed_cache.items() if entry[1] > now}
+        ttl = PROCESSED_CACHE_POSITIVE_TTL if processed else PROCESSED_CACHE_NEGATIVE_TTL
+        self._processed_cache[source_ip] = (processed, now + ttl)
+
+    async def get_processed_ips(self, source_ips: List[str]) -> set:
+        """여러 IP 의 처리 여부를 프로세스 내 단기 캐시 + 한 번의 MGET 으로 조회해 처리된 IP 집합 반환."""
+        now = time.monotonic()
+        processed_ips = set()
+        lookup = []
+        for source_ip in dict.fromkeys(source_ips):
+            cached = self._processed_cache.get(source_ip)
+            if cached and cached[1] > now:
+                if cached[0]:
+                    processed_ips.add(source_ip)
+            else:
+                lookup.append(source_ip)
+
+        if not lookup:
+            return processed_ips
+
+        keys = [f"{REDIS_KEY_PREFIX['PROCESSED']}:{source_ip}" for source_ip in lookup]
+
+        async def _mget_operation():
+            return await self.redis_client.mget(keys)
+
+        values = await self._execute_with_retry(_mget_operation)
+        for source_ip, value in zip(lookup, values):
+            self._cache_processed(source_ip, value is not None)
+            if value is not None:
+                processed_ips.add(source_ip)
+        return processed_ips
+
+    async def get_predictions(self, keys: List[str]) -> List[Optional[str]]:
+        """캐시된 예측 결과 일괄 조회."""
+        if not keys:
+            return []
+        redis_keys = [f"{REDIS_KEY_PREFIX['PREDICTION']}:{key}" for key in keys]
+
+        async def _mget_operation():
+            return await self.redis_client.mget(redis_keys)
+
+        return await self._execute_with_retry(_mget_operation)
+
+    async def set_predictions(self, predictions: Dict[str, str], ttl: int = 86400) -> None:
+        """예측 결과를 TTL 과 함께 일괄 저장."""
+        if not predictions:
+            return
+
+        async def _set_operation():
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value in predictions.items():
+                    pipe.set(f"{REDIS_KEY_PREFIX['PREDICTION']}:{key}", value, ex=ttl)
+                await pipe.execute()
+
+        await self._execute_with_retry(_set_operation)
+
+    async def get_checkpoint(self, name: str) -> Optional[Dict[str, Any]]:
+        """저장된 수집 커서 조회."""
+        key = f"{REDIS_KEY_PREFIX['CHECKPOINT']}:{name}"
+
+        async def _get_operation():
+            value = await self.redis_client.get(key)
+            return json.loads(value) if value else None
+
+        return await self._execute_with_retry(_get_operation)
+
+    async def set_checkpoint(self, name: str, checkpoint: Dict[str, Any]) -> None:
+        """수집 커서 저장 (TTL 없음)."""
+        key = f"{REDIS_KEY_PREFIX['CHECKPOINT']}:{name}"
+
+        async def _set_operation():
+            await self.redis_client.set(key, json.dumps(checkpoint))
+
+        await self._execute_with_retry(_set_operation)
+
+    async def acquire_lock(self, name: str, owner: str, ttl_ms: int) -> bool:
+        """lease 락 획득 (SET NX PX)."""
+        key = f"{REDIS_KEY_PREFIX['LOCK']}:{name}"
 
-        async def _check_operation():
-            return await self.redis_client.exists(key)
\ No newline at end of file
+        async def _acquire_operation():
+            return bool(await self.redis_client.set(key, owner, nx=True, px=ttl_ms))
+
+        return await self._execute_with_retry(_acquire_operation)
+
+    async def renew_lock(self, name: str, owner: str, ttl_ms: int) -> bool:
+        """내가 소유한 lease 락의 만료 연장."""
+        key = f"{REDIS_KEY_PREFIX['LOCK']}:{name}"
+
+        async def _renew_operation():
+            return bool(await self.redis_client.eval(RENEW_LOCK_SCRIPT, 1, key, owner, ttl_ms))
+
+        return await self._execute_with_retry(_renew_operation)
+
+    async def release_lock(self, name: str, owner: str) -> None:
+        """내가 소유한 lease 락 해제."""
+        key = f"{REDIS_KEY_PREFIX['LOCK']}:{name}"
+
+        async def _release_operation():
+            await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, key, owner)
+
+        await self._execute_with_retry(_release_operation)
+
+    async def heartbeat_member(self, name: str, member: str, ttl_ms: int) -> int:
+        """member 의 생존 신호를 ttl_ms 동안 유지하고 현재 살아 있는 member 수 반환."""
+        key = f"{REDIS_KEY_PREFIX['MEMBERS']}:{name}"
+
+        async def _heartbeat_operation():
+            now_ms = int(time.time() * 1000)
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.zadd(key, {member: now_ms + ttl_ms})
+                pipe.zremrangebyscore(key, "-inf", now_ms)
+                pipe.zcard(key)
+                results = await pipe.execute()
+            return results[-1]
+
+        return await self._execute_with_retry(_heartbeat_operation)
+
+    async def remove_member(self, name: str, member: str) -> None:
+        key = f"{REDIS_KEY_PREFIX['MEMBERS']}:{name}"
+
+        async def _remove_operation():
+            await self.redis_client.zrem(key, member)
+
+        await self._execute_with_retry(_remove_operation)
+
+    def stream_key(self, partition: int) -> str:
+        return f"{REDIS_KEY_PREFIX['STREAM']}:{partition}"
+
+    async def stream_add_many(self, entries: List[Tuple[str, Dict[str, str]]], maxlen: int = 100000) -> None:
+        """(stream, fields) 목록을 하나의 파이프라인으로 XADD."""
+        if not entries:
+            return
+
+        async def _xadd_operation():
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for stream, fields in entries:
+                    pipe.xadd(stream, fields, maxlen=maxlen, approximate=True)
+                await pipe.execute()
+
+        await self._execute_with_retry(_xadd_operation)
+
+    async def ensure_consumer_group(self, stream: str, group: str) -> None:
+        """consumer group 생성 (이미 있으면 무시)."""
+        async def _group_operation():
+            try:
+                await self.redis_client.xgroup_create(stream, group, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+        await self._execute_with_retry(_group_operation)
+
+    async def stream_read_group(self, group: str, consumer: str, streams: List[str],
+                                count: int = 100, block_ms: int = 5000) -> List[Tuple[str, str, Dict[str, str]]]:
+        """consumer group 으로 새 메시지 읽기. (stream, message_id, fields) 목록 반환."""
+        async def _read_operation():
+            response = await self.redis_client.xreadgroup(
+                group, consumer, {stream: ">" for stream in streams}, count=count, block=block_ms
+            )
+            return [
+                (stream, message_id, fields)
+                for stream, messages in (response or [])
+                for message_id, fields in messages
+            ]
+
+        return await self._execute_with_retry(_read_operation)
+
+    async def stream_autoclaim(self, stream: str, group: str, consumer: str,
+                               min_idle_ms: int, count: int = 100) -> List[Tuple[str, str, Dict[str, str]]]:
+        """min_idle_ms 이상 ack 되지 않은 pending 메시지를 가져옴 (죽은 consumer 복구)."""
+        async def _claim_operation():
+            response = await self.redis_client.xautoclaim(stream, group, consumer, min_idle_ms, start_id="0-0", count=count)
+            return [(stream, message_id, fields) for message_id, fields in response[1] if fields]
+
+        return await self._execute_with_retry(_claim_operation)
+
+    async def stream_dead_letter(self, stream: str, group: str, min_idle_ms: int,
+                                 max_deliveries: int, count: int = 100) -> int:
+        """max_deliveries 번 이상 전달되고도 ack 되지 않은 pending 메시지를 <stream>:dead 로 옮기고 ack. 옮긴 개수 반환."""
+        async def _dead_letter_operation():
+            pending = await self.redis_client.xpending_range(
+                stream, group, min="-", max="+", count=count, idle=min_idle_ms
+            )
+            dead = [entry for entry in pending if entry["times_delivered"] >= max_deliveries]
+            if not dead:
+                return 0
+
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for entry in dead:
+                    pipe.xrange(stream, min=entry["message_id"], max=entry["message_id"])
+                messages = await pipe.execute()
+
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                for entry, message in zip(dead, messages):
+                    fields = message[0][1] if message else {}
+                    pipe.xadd(f"{stream}:dead", {
+                        **fields,
+                        "source_id": entry["message_id"],
+                        "times_delivered": entry["times_delivered"],
+                    })
+                    pipe.xack(stream, group, entry["message_id"])
+                await pipe.execute()
+            return len(dead)
+
+        return await self._execute_with_retry(_dead_letter_operation)
+
+    async def stream_ack(self, stream: str, group: str, message_ids: List[str]) -> None:
+        if not message_ids:
+            return
+
+        async def _ack_operation():
+            await self.redis_client.xack(stream, group, *message_ids)
+
+        await self._execute_with_retry(_ack_operation)
+
+    async def next_sequence(self, name: str) -> int:
+        """replica 간 공유되는 단조 증가 id 발급 (INCR)."""
+        key = f"{REDIS_KEY_PREFIX['SEQUENCE']}:{name}"
+
+        async def _incr_operation():
+            return await self.redis_client.incr(key)
+
+        return await self._execute_with_retry(_incr_operation)
+
+    async def publish_message(self, channel: str, message: str) -> None:
+        """pub/sub 채널로 메시지 발행."""
+        key = f"{REDIS_KEY_PREFIX['CHANNEL']}:{channel}"
+
+        async def _publish_operation():
+            await self.redis_client.publish(key, message)
+
+        await self._execute_with_retry(_publish_operation)
+
+    async def listen_messages(self, channel: str) -> AsyncIterator[str]:
+        """pub/sub 채널 구독. 연결이 끊기면 예외가 그대로 전파되므로 호출 측에서 재구독."""
+        key = f"{REDIS_KEY_PREFIX['CHANNEL']}:{channel}"
+        pubsub = self.redis_client.pubsub()
+        await pubsub.subscribe(key)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.aclose()
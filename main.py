@@ -1,10 +1,16 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from common.logging import setup_logger
 from database.mongodb_driver import mongodb
 from database.redis_driver import RedisDriver
 from services.es_service import ElasticsearchService
-from routers import user_router, prompt_router, bert_router, policy_router, dashboard_router, report_router
+from ai.model_registry import ModelRegistry
+from services.bert.prediction_cache import create_prediction_cache
+from services.bert.detection_hub import DetectionHub
+from services.bert.ingestion import INGEST_MODE, DetectionIngestor, create_bert_service
+from services.bert.stream_ingestion import StreamIngestor
+from routers import user_router, prompt_router, bert_router, policy_router, dashboard_router, report_router, health_router
 
 logger = setup_logger()
 
@@ -18,12 +24,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-routers = [user_router, prompt_router, bert_router, policy_router, dashboard_router, report_router]
+routers = [user_router, prompt_router, bert_router, policy_router, dashboard_router, report_router, health_router]
 for router in routers:
     app.include_router(router.router)
 
 app.state.redis_driver = None
 app.state.es_service = None
+app.state.model_registry = ModelRegistry()
+app.state.warmup_task = None
+app.state.detection_hub = DetectionHub()
+app.state.detection_ingestor = None
 async def initialize_service(service_name, initializer):
     try:
         await initializer()
@@ -58,12 +68,47 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Elasticsearch 초기화 중 오류 발생: {e}")
 
+    try:
+        prediction_cache = create_prediction_cache(app.state.redis_driver)
+        await asyncio.to_thread(app.state.model_registry.load, prediction_cache)
+        logger.info("BERT 모델이 성공적으로 로드되었습니다.")
+        # warmup 이 끝날 때까지 /health/ready 는 503 (not-ready)
+        app.state.warmup_task = asyncio.create_task(app.state.model_registry.warmup())
+    except Exception as e:
+        logger.error(f"BERT 모델 로드 중 오류 발생: {e}")
+
+    try:
+        # DETECTION_FANOUT=redis 이면 모든 replica 가 탐지 채널을 구독해 자기 SSE 구독자에게 전달
+        await app.state.detection_hub.start(app.state.redis_driver)
+    except Exception as e:
+        logger.error(f"탐지 이벤트 구독 시작 중 오류 발생: {e}")
+
+    try:
+        ingestor_class = StreamIngestor if INGEST_MODE == "stream" else DetectionIngestor
+        detection_ingestor = ingestor_class(
+            es_service=app.state.es_service,
+            redis_driver=app.state.redis_driver,
+            bert_service=create_bert_service(app.state.model_registry),
+            detection_hub=app.state.detection_hub,
+        )
+        detection_ingestor.start()
+        app.state.detection_ingestor = detection_ingestor
+        logger.info(f"탐지 수집 루프가 시작되었습니다. (mode={INGEST_MODE})")
+    except Exception as e:
+        logger.error(f"탐지 수집 루프 시작 중 오류 발생: {e}")
+
     logger.info("애플리케이션이 성공적으로 시작되었습니다.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("애플리케이션 종료 중...")
 
+    if app.state.detection_ingestor:
+        await app.state.detection_ingestor.stop()
+        logger.info("탐지 수집 루프가 종료되었습니다.")
+
+    await app.state.detection_hub.stop()
+
     await shutdown_service("MongoDB", mongodb.close)
 
     try:
@@ -81,4 +126,9 @@ async def shutdown_event():
             logger.info("Elasticsearch 연결이 성공적으로 종료되었습니다.")
     except Exception as e:
         logger.error(f"Elasticsearch 종료 중 오류 발생: {e}")
+
+    if app.state.warmup_task:
+        app.state.warmup_task.cancel()
+    app.state.model_registry.close()
+    logger.info("BERT 모델이 해제되었습니다.")
     logger.info("애플리케이션 종료가 완료되었습니다.")
\ No newline at end of file
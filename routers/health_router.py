@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from ai.model_registry import ModelRegistry, get_model_registry
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+@router.get("/live", summary="Liveness probe")
+async def liveness():
+    return {"status": "alive"}
+
+@router.get("/ready", summary="Readiness probe (BERT model loaded and warmed up)")
+async def readiness(model_registry: ModelRegistry = Depends(get_model_registry)):
+    if not model_registry.ready:
+        return JSONResponse(status_code=503, content={"status": "not-ready"})
+    return {"status": "ready", "warmup_seconds": model_registry.warmup_seconds}
@@ -1,3 +1,5 @@
+from typing import Optional
+from datetime import datetime
 from pydantic import BaseModel
 
 
@@ -8,4 +10,16 @@ class PredictionSchema(BaseModel):
     prompt_session_id: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ModelStatusSchema(BaseModel):
+    pid: int
+    loaded: bool
+    ready: bool
+    load_count: int
+    load_seconds: Optional[float] = None
+    loaded_at: Optional[datetime] = None
+    warmup_seconds: Optional[float] = None
+    rss_bytes: int
+    model_rss_bytes: Optional[int] = None
+    inference_pool: Optional[dict] = None
@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+from database.redis_driver import RedisDriver
+from common.logging import setup_logger
+from common.metrics import metrics
+
+logger = setup_logger()
+
+SSE_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SSE_SUBSCRIBER_QUEUE_SIZE", "100"))
+SSE_REPLAY_BUFFER_SIZE = int(os.getenv("SSE_REPLAY_BUFFER_SIZE", "1000"))  # Last-Event-ID 재전송용 최근 이벤트 수
+DETECTION_FANOUT = os.getenv("DETECTION_FANOUT", "local")  # local | redis (replica 간 pub/sub fan-out)
+DETECTION_CHANNEL = "detections"
+LISTENER_RETRY_INTERVAL = 5
+
+
+class DetectionHub:
+    """탐지 이벤트를 SSE 구독자들에게 fan-out 하는 broadcast hub.
+
+    DETECTION_FANOUT=redis 이면 publish 는 Redis 채널로 나가고, 모든 replica 의 hub 가 채널을 구독해
+    자기 프로세스의 SSE 구독자에게 전달한다.
+
+    이벤트마다 단조 증가 id 를 붙이고 최근 replay_size 개를 ring buffer 에 보관해, Last-Event-ID 로
+    재접속한 구독자에게 놓친 이벤트만 다시 보낸다. redis 모드에서는 id 를 INCR 로 발급해 replica 간에도 유효.
+    """
+
+    def __init__(self, queue_size: int = SSE_SUBSCRIBER_QUEUE_SIZE, fanout: str = DETECTION_FANOUT,
+                 replay_size: int = SSE_REPLAY_BUFFER_SIZE):
+        self.queue_size = queue_size
+        self.fanout = fanout
+        self.redis_driver = None
+        self._subscribers = set()
+        self._listener = None
+        self._replay = deque(maxlen=replay_size)
+        # 재시작 후에도 id 가 이전 값보다 커지도록 시작 시각(ms)에서 출발
+        self._last_id = int(time.time() * 1000)
+
+    async def start(self, redis_driver: RedisDriver):
+        if self.fanout != "redis" or self._listener is not None:
+            return
+        self.redis_driver = redis_driver
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    def subscribe(self, last_event_id: int = None):
+        """구독 큐와 last_event_id 이후 놓친 이벤트 목록을 반환.
+
+        큐 등록과 replay 스냅샷 사이에 await 가 없으므로 누락이나 중복 없이 이어진다.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        metrics.set_gauge("hub.subscribers", len(self._subscribers))
+
+        missed = []
+        if last_event_id is not None:
+            missed = [item for item in self._replay if item[0] > last_event_id]
+            if self._replay and self._replay[0][0] > last_event_id + 1:
+                # 버퍼보다 오래된 id: 보관 중인 이벤트만 재전송 가능
+                metrics.increment("hub.replay_gaps")
+            metrics.increment("hub.replayed", len(missed))
+        return queue, missed
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        metrics.set_gauge("hub.subscribers", len(self._subscribers))
+
+    async def publish(self, event: dict):
+        published_at = time.time()
+        if self.redis_driver is None:
+            self._last_id += 1
+            self._broadcast(self._last_id, event, published_at)
+            metrics.increment("hub.published")
+            return
+
+        event_id = await self.redis_driver.next_sequence(DETECTION_CHANNEL)
+        message = json.dumps({"id": event_id, "event": event, "published_at": published_at})
+        await self.redis_driver.publish_message(DETECTION_CHANNEL, message)
+        metrics.increment("hub.published")
+
+    def _broadcast(self, event_id: int, event: dict, published_at: float):
+        # 구독 큐에는 (id, publish 시각, 이벤트) 를 넣어 SSE 전송 시점에 전달 지연을 잴 수 있게 함
+        item = (event_id, published_at, event)
+        self._replay.append(item)
+        for queue in list(self._subscribers):
+            if queue.full():
+                # 느린 구독자 때문에 수집 루프가 막히지 않도록 가장 오래된 이벤트를 버림
+                queue.get_nowait()
+                metrics.increment("hub.dropped")
+            queue.put_nowait(item)
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self.redis_driver.listen_messages(DETECTION_CHANNEL):
+                    payload = json.loads(message)
+                    metrics.increment("hub.received")
+                    metrics.observe("hub.fanout_latency", time.time() - payload["published_at"])
+                    self._broadcast(payload["id"], payload["event"], payload["published_at"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Detection channel listener failed: {e}")
+                await asyncio.sleep(LISTENER_RETRY_INTERVAL)
@@ -0,0 +1,475 @@
+import os
+import re
+import json
+import time
+import asyncio
+from uuid import uuid4
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from ai.model_registry import ModelRegistry
+from database.redis_driver import RedisDriver
+from services.es_service import ElasticsearchService
+from services.bert_service import BERTService
+from services.gpt_service import GPTService
+from services.asset_service import AssetService
+from services.policy_service import PolicyService
+from services.bert.detection_hub import DETECTION_FANOUT, DetectionHub
+from services.bert.pipeline import PipelineStage
+from services.policy.common_utils import load_json
+from repositories.asset_repository import AssetRepository
+from repositories.bert_repository import BertRepository
+from repositories.prompt_repository import PromptRepository
+from repositories.user_repository import UserRepository
+from common.logging import setup_logger
+from common.metrics import metrics
+
+logger = setup_logger()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BASE_DIR))
+COMMON_DIR = os.path.join(PROJECT_ROOT, "common")
+
+TACTICS_MAPPING_FILE = os.path.join(COMMON_DIR, "tactics_mapping.json")
+
+tactics_mapping = load_json(TACTICS_MAPPING_FILE) or {}
+
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "1"))  # 새 로그가 있을 때의 poll 간격
+POLL_INTERVAL_MAX = float(os.getenv("POLL_INTERVAL_MAX", "30"))  # 유휴 시 지수 backoff 상한
+POLL_COUNT_PROBE_INTERVAL = float(os.getenv("POLL_COUNT_PROBE_INTERVAL", "0"))  # backoff 중 _count probe 주기 (0 이면 사용 안 함)
+ERROR_RETRY_INTERVAL = 10
+PAGE_RETRY_INTERVAL = 1  # buffer 실패 페이지 재시도 시작 간격 (ERROR_COOLDOWN_INTERVAL 까지 두 배씩)
+ERROR_COOLDOWN_INTERVAL = 60
+MAX_RETRIES = 3
+ES_INDEX = os.getenv("ES_INDEX")
+ES_ATTACK_INDEX = os.getenv("ES_ATTACK_INDEX")
+ES_PAGE_SIZE = int(os.getenv("ES_PAGE_SIZE", "100"))
+INGEST_IP_CONCURRENCY = int(os.getenv("INGEST_IP_CONCURRENCY", "8"))  # infer 단계 worker 수 (source IP 로 파티션)
+PIPELINE_BUFFER_CONCURRENCY = int(os.getenv("PIPELINE_BUFFER_CONCURRENCY", "1"))  # 2 이상이면 페이지 간 큐 반영 순서가 섞일 수 있음
+PIPELINE_ENRICH_CONCURRENCY = int(os.getenv("PIPELINE_ENRICH_CONCURRENCY", "4"))
+PIPELINE_BUFFER_QUEUE_SIZE = int(os.getenv("PIPELINE_BUFFER_QUEUE_SIZE", "4"))  # 대기 가능한 페이지 수
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))  # infer / enrich 단계 대기 항목 수
+INGEST_MODE = os.getenv("INGEST_MODE", "local")  # local | stream (Redis Streams 로 replica 간 분산)
+ES_TIEBREAKER_FIELD = os.getenv("ES_TIEBREAKER_FIELD", "eventID.keyword")  # 같은 @timestamp 내 정렬 기준
+BACKFILL_MAX_AGE = timedelta(days=1)
+BACKFILL_RATE = float(os.getenv("BACKFILL_RATE", "0"))  # 따라잡기 중 초당 최대 처리 로그 수 (0 이면 제한 없음)
+CHECKPOINT_NAME = "ingest:es_tail"
+# tiebreaker 필드가 매핑되지 않은 인덱스가 패턴에 섞여 있어도 정렬이 거부되지 않도록 unmapped_type 지정
+TAIL_SORT = [
+    {"@timestamp": {"order": "asc"}},
+    {ES_TIEBREAKER_FIELD: {"order": "asc", "missing": "_first", "unmapped_type": "keyword"}},
+]
+
+if not ES_INDEX or not ES_ATTACK_INDEX:
+    raise ValueError("Environment variables 'ES_INDEX' and 'ES_ATTACK_INDEX' must be set.")
+
+# redis fan-out 에서는 모든 replica 가 같은 채널을 받으므로, 탐지는 stream 모드로 replica 간에 나눠야 중복되지 않음
+if DETECTION_FANOUT == "redis" and INGEST_MODE != "stream":
+    raise ValueError("DETECTION_FANOUT=redis requires INGEST_MODE=stream; otherwise every replica detects and publishes the same logs.")
+
+def normalize_key(key: str) -> str:
+    match = re.match(r"(t\d+)([a-z]+)", key, re.I)
+    if not match:
+        return key
+
+    technique_id = match.group(1).upper()
+    description = re.sub(r"([a-z])([A-Z])", r"\1 \2", match.group(2)).title()
+
+    return f"{technique_id} - {description}"
+
+
+def _parse_timestamp(value: str) -> datetime:
+    timestamp = datetime.fromisoformat(value)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def create_bert_service(model_registry: ModelRegistry) -> BERTService:
+    """요청 컨텍스트 밖(백그라운드 작업)에서 쓸 BERTService 구성."""
+    return BERTService(
+        bert_repository=BertRepository(),
+        prompt_repository=PromptRepository(),
+        asset_service=AssetService(asset_repository=AssetRepository()),
+        gpt_service=GPTService(),
+        policy_service=PolicyService(user_repository=UserRepository()),
+        predictor=model_registry.predictor,
+        incremental_detector=model_registry.incremental_detector,
+    )
+
+
+class _PageJob:
+    """한 페이지의 IP 별 추론과 그 결과 탐지들의 enrich 완료를 모아 제출자에게 실패한 source IP 집합으로 알림."""
+
+    def __init__(self, future: asyncio.Future, remaining: int):
+        self.future = future
+        self.remaining = remaining
+        self.failed_ips = set()
+
+    def add(self, count: int):
+        self.remaining += count
+
+    def done(self, source_ip: str, failed: bool):
+        if failed:
+            self.failed_ips.add(source_ip)
+        self.remaining -= 1
+        if self.remaining == 0 and not self.future.done():
+            self.future.set_result(self.failed_ips)
+
+
+class DetectionIngestor:
+    """프로세스당 하나의 ES 수집 / 탐지 루프. 탐지 결과는 DetectionHub 로 publish.
+
+    fetch(run 루프) → buffer(Redis 로그 큐) → infer(BERT, source IP 로 파티션) → enrich(저장 / GPT / publish)
+    단계를 bounded 큐로 연결해, 느린 단계가 있으면 앞 단계가 큐에서 대기하며 속도를 맞춘다.
+    """
+
+    def __init__(self, es_service: ElasticsearchService, redis_driver: RedisDriver,
+                 bert_service: BERTService, detection_hub: DetectionHub):
+        self.es_service = es_service
+        self.redis_driver = redis_driver
+        self.bert_service = bert_service
+        self.detection_hub = detection_hub
+        self._task = None
+        self._uncommitted = deque()
+        self._tail_start = None  # ES 조회 하한: 마지막으로 커밋된 페이지의 @timestamp
+        self._inflight_ips = {}  # source_ip -> enrich 대기 / 처리 중인 탐지 수
+
+        self.enrich_stage = PipelineStage(
+            "enrich", self.enrich_detection, PIPELINE_ENRICH_CONCURRENCY, PIPELINE_QUEUE_SIZE
+        )
+        self.infer_stage = PipelineStage(
+            "infer", self.infer_ip_logs, INGEST_IP_CONCURRENCY, PIPELINE_QUEUE_SIZE,
+            downstream=self.enrich_stage, partition_key=lambda item: item[0]
+        )
+        self.buffer_stage = PipelineStage(
+            "buffer", self.buffer_page, PIPELINE_BUFFER_CONCURRENCY, PIPELINE_BUFFER_QUEUE_SIZE,
+            downstream=self.infer_stage
+        )
+        self.stages = [self.buffer_stage, self.infer_stage, self.enrich_stage]
+
+    def start_pipeline(self):
+        for stage in self.stages:
+            stage.start()
+
+    async def stop_pipeline(self):
+        for stage in self.stages:
+            await stage.stop()
+
+    def start(self):
+        self.start_pipeline()
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.stop_pipeline()
+
+    async def load_checkpoint(self):
+        """저장된 (@timestamp, tiebreaker) 커서를 읽어 (start_timestamp, last_sort_key) 반환.
+
+        커서가 없거나 BACKFILL_MAX_AGE 보다 오래됐으면 BACKFILL_MAX_AGE 전부터 다시 시작.
+        """
+        default_start = datetime.now(timezone.utc) - BACKFILL_MAX_AGE
+        try:
+            checkpoint = await self.redis_driver.get_checkpoint(CHECKPOINT_NAME)
+        except Exception as e:
+            logger.error(f"Failed to load ingestion checkpoint: {e}")
+            checkpoint = None
+
+        if checkpoint and _parse_timestamp(checkpoint["timestamp"]) >= default_start:
+            logger.info(f"Resuming ingestion from checkpoint: {checkpoint}")
+            return checkpoint["timestamp"], checkpoint["sort_key"]
+        return default_start.isoformat(), None
+
+    async def save_checkpoint(self, logs: list, last_sort_key: list):
+        await self.redis_driver.set_checkpoint(
+            CHECKPOINT_NAME, {"timestamp": logs[-1]["@timestamp"], "sort_key": last_sort_key}
+        )
+        # 조회 하한도 커밋된 위치로 올려 질의 대상 문서가 계속 늘지 않게 함 (중복은 search_after 커서가 막음)
+        self._tail_start = logs[-1]["@timestamp"]
+
+    async def commit_checkpoints(self):
+        """앞에서부터 처리가 끝난 페이지까지만 커서를 저장 (페이지 순서대로만 전진)."""
+        committed = None
+        while self._uncommitted and (self._uncommitted[0][0] is None or self._uncommitted[0][0].done()):
+            _, logs, sort_key = self._uncommitted.popleft()
+            committed = (logs, sort_key)
+        if committed:
+            await self.save_checkpoint(*committed)
+
+    async def run(self):
+        backfilling = True
+        self._tail_start, last_sort_key = await self.load_checkpoint()
+        last_timestamp = self._tail_start
+        poll_interval = POLL_INTERVAL
+        error_count = 0
+
+        while True:
+            try:
+                # (@timestamp, tiebreaker) 커서 이후의 페이지를 모두 소진 (꽉 찬 페이지면 바로 다음 페이지 조회)
+                fetched = 0
+                while True:
+                    page_started = time.monotonic()
+                    logs, sort_key = await fetch_logs_from_elasticsearch(
+                        self.es_service, self._tail_start, last_sort_key
+                    )
+                    metrics.observe("pipeline.fetch.service_time", time.monotonic() - page_started)
+                    fetched += len(logs)
+
+                    # 파이프라인에 넘긴 페이지는 처리가 끝난 뒤에만 커서를 저장해 재시작 시 그 다음부터 이어서 수집
+                    future = await self.handle_page(logs)
+                    if logs:
+                        self._uncommitted.append((future, logs, sort_key))
+                        last_timestamp = logs[-1]["@timestamp"]
+                    last_sort_key = sort_key
+                    await self.commit_checkpoints()
+
+                    if len(logs) < ES_PAGE_SIZE:
+                        break
+
+                    # 따라잡기 중에는 처리량을 BACKFILL_RATE 로 제한해 실시간 요청이 밀리지 않게 함
+                    if backfilling and BACKFILL_RATE > 0:
+                        await asyncio.sleep(max(0.0, len(logs) / BACKFILL_RATE - (time.monotonic() - page_started)))
+
+                if backfilling:
+                    logger.info("Backfill complete. Switching to real-time streaming.")
+                    backfilling = False
+
+                error_count = 0
+                # 새 로그가 있었으면 최소 간격으로, 없었으면 POLL_INTERVAL_MAX 까지 두 배씩 늘림
+                poll_interval = POLL_INTERVAL if fetched else min(poll_interval * 2, POLL_INTERVAL_MAX)
+                metrics.set_gauge("ingestion.poll_interval", poll_interval)
+                await self.commit_checkpoints()
+                await self.wait_for_next_poll(poll_interval, last_timestamp)
+
+            except asyncio.CancelledError:
+                logger.info("Detection ingestion stopped.")
+                raise
+            except Exception as e:
+                error_count += 1
+                logger.error(f"Error in detection ingestion: {e}")
+                # Redis 장애로 에러 알림 publish 가 실패해도 수집 루프는 계속 재시도
+                try:
+                    await self.detection_hub.publish({"error": str(e)})
+                except Exception as publish_error:
+                    logger.error(f"Failed to publish ingestion error: {publish_error}")
+                if error_count >= MAX_RETRIES:
+                    logger.critical(f"Max retries reached. Pausing detection ingestion for {ERROR_COOLDOWN_INTERVAL}s.")
+                    error_count = 0
+                    await asyncio.sleep(ERROR_COOLDOWN_INTERVAL)
+                else:
+                    await asyncio.sleep(ERROR_RETRY_INTERVAL)
+
+    async def wait_for_next_poll(self, interval: float, since: str):
+        """interval 동안 대기. POLL_COUNT_PROBE_INTERVAL 이 설정되면 그 주기로 since 이후 문서 수를
+        _count 로 확인해 새 로그가 보이는 즉시 깨어남."""
+        if POLL_COUNT_PROBE_INTERVAL <= 0 or interval <= POLL_COUNT_PROBE_INTERVAL:
+            await asyncio.sleep(interval)
+            return
+
+        deadline = time.monotonic() + interval
+        while (remaining := deadline - time.monotonic()) > POLL_COUNT_PROBE_INTERVAL:
+            await asyncio.sleep(POLL_COUNT_PROBE_INTERVAL)
+            if await probe_new_logs(self.es_service, since):
+                metrics.increment("ingestion.early_polls")
+                return
+        await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+
+    async def handle_page(self, logs: list):
+        """페이지가 Redis 로그 큐에 반영될 때까지 기다린 뒤 처리 완료 future 를 반환.
+
+        buffer 단계가 실패하면 더 새로운 페이지를 가져오지 않고 같은 페이지를 backoff 하며 다시 제출해,
+        재시도된 로그가 이후 로그 뒤에 붙어 IP 별 순서가 깨지지 않게 한다.
+        """
+        delay = PAGE_RETRY_INTERVAL
+        while True:
+            try:
+                return await self.submit(logs)
+            except Exception as e:
+                logger.error(f"Failed to buffer page, retrying in {delay}s: {e}")
+                metrics.increment("ingestion.failed_pages")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, ERROR_COOLDOWN_INTERVAL)
+
+    async def submit(self, logs: list, reseed: bool = False) -> asyncio.Future:
+        """페이지를 buffer 단계에 넣고 로그 큐 반영이 끝나면, 모든 IP 의 추론과 탐지 enrich 가 끝날 때
+        실패한 source IP 집합으로 완료되는 future 반환. buffer 단계의 실패는 여기서 예외로 전달.
+        """
+        loop = asyncio.get_running_loop()
+        buffered, future = loop.create_future(), loop.create_future()
+        await self.buffer_stage.put((logs, reseed, buffered, future))
+        await buffered
+        return future
+
+    async def process_logs(self, logs: list, reseed: bool = False) -> set:
+        """한 poll 의 로그를 처리하고 처리에 실패한 source IP 집합을 반환."""
+        return await (await self.submit(logs, reseed))
+
+    async def buffer_page(self, item):
+        logs, reseed, buffered, future = item
+        try:
+            source_ips = [log.get("sourceIPAddress", "unknown") for log in logs]
+            processed_ips = await self.redis_driver.get_processed_ips([ip for ip in source_ips if ip != "unknown"])
+            pending = [
+                (source_ip, log) for source_ip, log in zip(source_ips, logs)
+                if source_ip != "unknown" and source_ip not in processed_ips and source_ip not in self._inflight_ips
+            ]
+
+            # 페이지 전체를 한 번의 파이프라인으로 IP 별 큐에 반영
+            windows = await self.redis_driver.push_log_queues(pending)
+        except Exception as e:
+            buffered.set_exception(e)
+            raise
+        buffered.set_result(None)
+
+        new_logs_by_ip = {}
+        for source_ip, log in pending:
+            new_logs_by_ip.setdefault(source_ip, []).append(log)
+        if not new_logs_by_ip:
+            future.set_result(set())
+            return None
+
+        job = _PageJob(future, len(new_logs_by_ip))
+        return [
+            (source_ip, new_logs, windows[source_ip], reseed, job)
+            for source_ip, new_logs in new_logs_by_ip.items()
+        ]
+
+    async def infer_ip_logs(self, item):
+        source_ip, new_logs, history, reseed, job = item
+        # buffer 이후 앞 페이지의 탐지로 처리 완료(또는 enrich 대기)가 된 IP 는 같은 공격을 다시 보내지 않도록 건너뜀.
+        # 같은 IP 는 항상 같은 infer worker 가 순서대로 처리하므로 여기서의 확인은 경쟁 없이 유효
+        if source_ip in self._inflight_ips or await self.redis_driver.is_processed(source_ip):
+            # 반영하지 않은 로그가 생기므로 다음에는 Redis 로그 큐 기준으로 상태를 다시 채움
+            self.bert_service.incremental_detector.forget(source_ip)
+            metrics.increment("pipeline.infer.skipped_processed")
+            job.done(source_ip, failed=False)
+            return None
+
+        try:
+            # 새 로그만 인코딩하고 영향받은 윈도우 위치의 (로그, 라벨) 을 받음
+            predictions = await self.bert_service.predict_incremental(source_ip, new_logs, history, reseed)
+        except Exception as e:
+            logger.error(f"Error processing logs for {source_ip}: {e}")
+            job.done(source_ip, failed=True)
+            return None
+
+        if predictions:
+            logger.info(f"Predictions: {[prediction for _, prediction in predictions]}")
+        detections = [
+            (source_ip, new_logs, history, buf, prediction, job)
+            for buf, prediction in predictions or []
+            if prediction != "No Attack"
+        ]
+        if detections:
+            # enrich 가 끝나 mark_as_processed 될 때까지 이후 페이지의 같은 IP 로그를 받지 않음
+            self._inflight_ips[source_ip] = self._inflight_ips.get(source_ip, 0) + len(detections)
+            # 페이지 완료(체크포인트 / XACK)는 이 탐지들의 enrich 까지 끝난 뒤
+            job.add(len(detections))
+        job.done(source_ip, failed=False)
+        return detections
+
+    async def enrich_detection(self, item):
+        source_ip, new_logs, history, buf, prediction, job = item
+        attack_data = None
+        try:
+            attack_data = await process_and_store_attack(
+                self.es_service, self.redis_driver, self.bert_service, source_ip, buf, prediction
+            )
+
+            if attack_data:
+                user_id = new_logs[-1].get("userId", "default_user")
+                attack_info = {
+                    "attack_time": attack_data["timestamp"],
+                    "attack_type": attack_data["mitreAttackTechnique"],
+                    "logs": history,
+                }
+                asyncio.create_task(handle_post_detection(self.bert_service, user_id, attack_info))
+
+                await self.detection_hub.publish(attack_data)
+                logger.info(f"Published detection: {json.dumps(attack_data)}")
+        finally:
+            remaining = self._inflight_ips.get(source_ip, 1) - 1
+            if remaining > 0:
+                self._inflight_ips[source_ip] = remaining
+            else:
+                self._inflight_ips.pop(source_ip, None)
+            # 저장에 실패한 탐지는 실패로 보고해 stream 모드에서 ack 하지 않고 재시도
+            job.done(source_ip, failed=attack_data is None)
+
+
+async def fetch_logs_from_elasticsearch(es_service: ElasticsearchService, start_timestamp: str, last_sort_key: list,
+                                        index: str = None):
+    """start_timestamp 이후 로그를 (@timestamp, tiebreaker) 순으로 last_sort_key 다음 페이지만 조회.
+
+    조회 실패는 빈 페이지로 삼키지 않고 그대로 올려 수집 루프의 재시도 / cooldown 으로 드러나게 함.
+    """
+    try:
+        logs, sort_key = await es_service.search_logs_after(
+            index=index or ES_INDEX,
+            query={"range": {"@timestamp": {"gte": start_timestamp}}},
+            sort=TAIL_SORT,
+            search_after=last_sort_key,
+            size=ES_PAGE_SIZE
+        )
+    except Exception:
+        metrics.increment("ingestion.fetch_errors")
+        raise
+    metrics.increment("ingestion.pages")
+    metrics.increment("ingestion.logs_fetched", len(logs))
+    return logs, sort_key
+
+async def probe_new_logs(es_service: ElasticsearchService, since: str) -> bool:
+    try:
+        count = await es_service.count_logs(index=ES_INDEX, query={"range": {"@timestamp": {"gt": since}}})
+        metrics.increment("ingestion.count_probes")
+        return count > 0
+    except Exception as e:
+        logger.error(f"Failed to probe new logs: {e}")
+        return False
+
+async def process_and_store_attack(es_service: ElasticsearchService, redis_driver: RedisDriver, bert_service: BERTService, source_ip: str, log: dict, prediction: str):
+    try:
+        logger.info(f"Processing log: {log}")
+        normalized_prediction = normalize_key(prediction)
+        tactic = tactics_mapping.get(normalized_prediction, "Unknown Tactic")
+        logger.info(f"Tactic mapped: {tactic}")
+
+        attack_info = {
+            "attack_type": [normalized_prediction, tactic],
+            "attack_time": datetime.now(timezone.utc).isoformat(),
+            "logs": log
+        }
+
+        prompt_session_id = await bert_service.process_after_detection(source_ip, attack_info)
+
+        attack_data = {
+            "mitreAttackTechnique": normalized_prediction,
+            "mitreAttackTactic": tactic,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "prompt_session_id": str(prompt_session_id)
+        }
+
+        combined_data = {**log, **attack_data}
+        log_id = f"{source_ip}_{log.get('@timestamp', datetime.now(timezone.utc).isoformat())}_{uuid4()}"
+        await es_service.save_document(
+            index=ES_ATTACK_INDEX,
+            doc_id=log_id,
+            body=combined_data
+        )
+        await redis_driver.mark_as_processed(source_ip)
+        return combined_data
+    except Exception as e:
+        logger.error(f"Failed to process and store attack: {e}")
+        return None
+
+async def handle_post_detection(bert_service: BERTService, user_id: str, attack_info: dict):
+    try:
+        await bert_service.process_after_detection(user_id, attack_info)
+        logger.info(f"Post-detection processing completed for user_id: {user_id}")
+    except Exception as e:
+        logger.error(f"Error in post-detection processing for user_id {user_id}: {e}", exc_info=True)
@@ -0,0 +1,76 @@
+import time
+import zlib
+import asyncio
+from typing import Awaitable, Callable, Iterable, Optional
+from common.logging import setup_logger
+from common.metrics import metrics
+
+logger = setup_logger()
+
+
+class PipelineStage:
+    """bounded 입력 큐 + worker 들로 구성된 파이프라인 한 단계.
+
+    handler(item) 가 반환한 항목들은 downstream 단계의 큐로 넘기며, downstream 큐가 가득 차면
+    worker 가 대기하므로 느린 단계의 backpressure 가 앞 단계로 전파된다.
+    partition_key 가 있으면 worker 마다 전용 큐를 두고 같은 key 의 항목을 항상 같은 worker 가
+    순서대로 처리한다. (예: source IP 별 순서 보장)
+
+    metrics: pipeline.<name>.queue_depth (gauge), pipeline.<name>.service_time, pipeline.<name>.errors
+    """
+
+    def __init__(self, name: str, handler: Callable[..., Awaitable[Optional[Iterable]]],
+                 concurrency: int = 1, queue_size: int = 100,
+                 downstream: "PipelineStage" = None, partition_key: Callable = None):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.downstream = downstream
+        self.partition_key = partition_key
+        num_queues = self.concurrency if partition_key else 1
+        self.queues = [asyncio.Queue(maxsize=queue_size) for _ in range(num_queues)]
+        self._workers = []
+
+    def start(self):
+        if self._workers:
+            return
+        for index in range(self.concurrency):
+            queue = self.queues[index] if self.partition_key else self.queues[0]
+            self._workers.append(asyncio.create_task(self._work(queue)))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self.queues)
+
+    async def put(self, item):
+        if self.partition_key:
+            key = str(self.partition_key(item)).encode("utf-8")
+            queue = self.queues[zlib.crc32(key) % len(self.queues)]
+        else:
+            queue = self.queues[0]
+        await queue.put(item)
+        metrics.set_gauge(f"pipeline.{self.name}.queue_depth", self.depth())
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            metrics.set_gauge(f"pipeline.{self.name}.queue_depth", self.depth())
+            started = time.perf_counter()
+            try:
+                outputs = await self.handler(item)
+            except Exception as e:
+                logger.error(f"Pipeline stage '{self.name}' failed: {e}")
+                metrics.increment(f"pipeline.{self.name}.errors")
+                outputs = None
+            finally:
+                metrics.observe(f"pipeline.{self.name}.service_time", time.perf_counter() - started)
+                queue.task_done()
+
+            if outputs and self.downstream is not None:
+                for output in outputs:
+                    await self.downstream.put(output)
@@ -0,0 +1,87 @@
+import os
+import hashlib
+from collections import OrderedDict
+from database.redis_driver import RedisDriver, RedisDriverError
+from common.logging import setup_logger
+from common.metrics import metrics
+
+logger = setup_logger()
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_REDIS = os.getenv("PREDICTION_CACHE_REDIS", "false").lower() == "true"
+PREDICTION_CACHE_TTL = int(os.getenv("PREDICTION_CACHE_TTL", "86400"))
+
+
+def default_model_tag() -> str:
+    """모델/백엔드가 바뀌면 캐시 키도 바뀌도록 하는 태그."""
+    model_source = os.getenv("MODEL_BUNDLE_PATH") or os.getenv("MODEL_PATH") or ""
+    parts = [
+        os.path.basename(model_source.rstrip("/")),
+        os.getenv("BERT_QUANTIZE", "") or "fp32",
+        os.getenv("BERT_MAX_LENGTH", "512"),
+    ]
+    return hashlib.sha1(":".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+class PredictionCache:
+    """전처리된 로그 텍스트의 해시 -> 라벨 id 캐시. 프로세스 내 LRU, 선택적으로 Redis(TTL) 공유."""
+
+    def __init__(self, redis_driver: RedisDriver = None, max_size: int = PREDICTION_CACHE_SIZE,
+                 ttl: int = PREDICTION_CACHE_TTL, model_tag: str = None):
+        self.redis_driver = redis_driver
+        self.max_size = max_size
+        self.ttl = ttl
+        self.model_tag = model_tag or default_model_tag()
+        self._entries = OrderedDict()
+
+    def _key(self, text: str) -> str:
+        return f"{self.model_tag}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _put_local(self, key: str, label_id: int):
+        self._entries[key] = label_id
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, texts: list) -> dict:
+        """{texts 내 index: 라벨 id} 형태로 캐시에 있는 항목만 반환."""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        for i, key in enumerate(keys):
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                found[i] = self._entries[key]
+
+        missing = [i for i in range(len(keys)) if i not in found]
+        if missing and self.redis_driver is not None:
+            try:
+                values = await self.redis_driver.get_predictions([keys[i] for i in missing])
+                for i, value in zip(missing, values):
+                    if value is not None:
+                        found[i] = int(value)
+                        self._put_local(keys[i], found[i])
+                        metrics.increment("prediction_cache.redis_hits")
+            except RedisDriverError as e:
+                logger.warning(f"Prediction cache lookup in Redis failed: {e}")
+
+        metrics.increment("prediction_cache.hits", len(found))
+        metrics.increment("prediction_cache.misses", len(keys) - len(found))
+        metrics.set_gauge("prediction_cache.size", len(self._entries))
+        return found
+
+    async def set_many(self, texts: list, label_ids: list):
+        entries = {self._key(text): int(label_id) for text, label_id in zip(texts, label_ids)}
+        for key, label_id in entries.items():
+            self._put_local(key, label_id)
+
+        if self.redis_driver is not None:
+            try:
+                await self.redis_driver.set_predictions(entries, ttl=self.ttl)
+            except RedisDriverError as e:
+                logger.warning(f"Prediction cache write to Redis failed: {e}")
+
+
+def create_prediction_cache(redis_driver: RedisDriver = None):
+    if PREDICTION_CACHE_SIZE <= 0:
+        return None
+    return PredictionCache(redis_driver if PREDICTION_CACHE_REDIS else None)
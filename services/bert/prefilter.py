@@ -0,0 +1,60 @@
+import os
+import numpy as np
+from common.logging import setup_logger
+from common.metrics import metrics
+from services.policy.common_utils import load_json
+
+logger = setup_logger()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BASE_DIR))
+BENIGN_EVENTS_FILE = os.path.join(PROJECT_ROOT, "common", "benign_events.json")
+
+PREFILTER_MODE = os.getenv("PREFILTER_MODE", "shadow")  # off | shadow | enforce
+PREFILTER_MODES = ("off", "shadow", "enforce")
+
+
+class LogPrefilter:
+    """allow-list 에 있는 이벤트로만 이루어진 윈도우를 BERT 추론 전에 걸러내는 규칙 기반 필터.
+
+    - off: 사용하지 않음
+    - shadow: 모든 윈도우를 BERT 로 추론하되, 걸러졌을 윈도우의 결과가 "No Attack" 인지 검증
+    - enforce: 걸러진 윈도우는 추론하지 않음 (해당 로그는 "No Attack")
+    """
+
+    def __init__(self, rules: dict = None, mode: str = PREFILTER_MODE):
+        if mode not in PREFILTER_MODES:
+            raise ValueError(f"Unsupported PREFILTER_MODE '{mode}'. Choose one of: {', '.join(PREFILTER_MODES)}")
+        rules = (load_json(BENIGN_EVENTS_FILE) or {}) if rules is None else rules
+        self.read_only = bool(rules.get("readOnly", False))
+        self.event_sources = set(rules.get("eventSources", []))
+        self.event_names = set(rules.get("eventNames", []))
+        self.mode = mode
+
+    def is_benign(self, log: dict) -> bool:
+        return (
+            log.get("eventSource") in self.event_sources
+            or log.get("eventName") in self.event_names
+            or (self.read_only and log.get("readOnly") is True)
+        )
+
+    def record(self, skippable: np.ndarray):
+        skipped = int(skippable.sum()) if self.mode == "enforce" else 0
+        metrics.increment("prefilter.windows_skipped", skipped)
+        metrics.increment("prefilter.windows_scored", len(skippable) - skipped)
+
+    def check_shadow(self, skippable: np.ndarray, window_labels: np.ndarray):
+        """shadow 모드: 걸러졌을 윈도우의 BERT 라벨이 모두 "No Attack" 인지 확인."""
+        if self.mode != "shadow" or not skippable.any():
+            return
+
+        shadow_labels = window_labels[skippable]
+        mismatches = int((shadow_labels != "No Attack").any(axis=1).sum())
+        metrics.increment("prefilter.shadow_windows", int(skippable.sum()))
+        metrics.increment("prefilter.shadow_mismatches", mismatches)
+        if mismatches:
+            logger.warning(f"Prefilter shadow check: {mismatches} benign-listed windows were labeled as attacks.")
+
+
+# 싱글턴 인스턴스 생성
+log_prefilter = LogPrefilter()
@@ -0,0 +1,235 @@
+import os
+import math
+import json
+import time
+import socket
+import asyncio
+import zlib
+from contextlib import suppress
+from services.bert.ingestion import DetectionIngestor, ERROR_RETRY_INTERVAL
+from common.logging import setup_logger
+from common.metrics import metrics
+
+logger = setup_logger()
+
+STREAM_PARTITIONS = int(os.getenv("STREAM_PARTITIONS", "8"))
+STREAM_WORKERS = int(os.getenv("STREAM_WORKERS", "2"))
+STREAM_GROUP = os.getenv("STREAM_GROUP", "detectors")
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", "100000"))
+STREAM_READ_COUNT = int(os.getenv("STREAM_READ_COUNT", "100"))
+STREAM_BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", "5000"))
+STREAM_CLAIM_IDLE_MS = int(os.getenv("STREAM_CLAIM_IDLE_MS", "60000"))
+STREAM_CLAIM_INTERVAL = float(os.getenv("STREAM_CLAIM_INTERVAL", "30"))
+STREAM_MAX_DELIVERIES = int(os.getenv("STREAM_MAX_DELIVERIES", "5"))  # 초과 시 <stream>:dead 로 이동
+STREAM_MAX_PARTITIONS = int(os.getenv("STREAM_MAX_PARTITIONS", "0"))  # replica 당 소유 파티션 상한 (0 이면 공평 분배 몫만 적용)
+POLLER_LEASE_MS = int(os.getenv("POLLER_LEASE_MS", "15000"))
+POLLER_LOCK_NAME = "ingest:poller"
+PARTITION_LOCK_NAME = "ingest:partition"
+REPLICA_MEMBERS_NAME = "ingest:replicas"
+
+
+class StreamIngestor(DetectionIngestor):
+    """INGEST_MODE=stream: replica 간 탐지 작업 분산.
+
+    - poller: lease 락을 잡은 replica 하나만 ES 를 polling 해 source IP 로 파티션된 Redis Stream 에 XADD
+    - worker: 파티션마다 lease 락을 잡은 replica 하나만 그 stream 을 읽으므로 같은 IP 는 항상 한 consumer 가
+      순서대로 처리. 파티션 p 는 그 replica 의 p % STREAM_WORKERS 번째 worker 가 consumer group 으로 읽어 탐지 후 XACK
+    - ack 되지 않은 채 STREAM_CLAIM_IDLE_MS 가 지난 메시지는 XAUTOCLAIM 으로 재시도하고,
+      STREAM_MAX_DELIVERIES 번 넘게 실패한 메시지는 <stream>:dead 로 옮김
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        self.streams = [self.redis_driver.stream_key(partition) for partition in range(STREAM_PARTITIONS)]
+        self.owned_partitions = set()
+        self._fresh_partitions = set()  # 새로 넘겨받아 이전 소유자의 pending 을 먼저 회수해야 하는 파티션
+        self._draining_partitions = set()  # 몫을 넘어 반납 예정 (lease 는 유지, 더 이상 읽지 않음)
+        self._busy_partitions = {}  # worker index -> 처리 중인 batch 의 파티션
+        self._tasks = []
+
+    def start(self):
+        if self._tasks:
+            return
+        self.start_pipeline()
+        self._tasks.append(asyncio.create_task(self.run_poller()))
+        self._tasks.append(asyncio.create_task(self.run_partition_leases()))
+        for index in range(STREAM_WORKERS):
+            self._tasks.append(asyncio.create_task(self.run_worker(index)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.stop_pipeline()
+        with suppress(Exception):
+            await self.redis_driver.release_lock(POLLER_LOCK_NAME, self.owner)
+        for partition in list(self.owned_partitions | self._draining_partitions):
+            with suppress(Exception):
+                await self.redis_driver.release_lock(f"{PARTITION_LOCK_NAME}:{partition}", self.owner)
+        self.owned_partitions.clear()
+        self._draining_partitions.clear()
+        with suppress(Exception):
+            await self.redis_driver.remove_member(REPLICA_MEMBERS_NAME, self.owner)
+
+    def stream_for(self, source_ip: str) -> str:
+        return self.streams[zlib.crc32(source_ip.encode("utf-8")) % STREAM_PARTITIONS]
+
+    async def run_poller(self):
+        while True:
+            try:
+                if await self.redis_driver.acquire_lock(POLLER_LOCK_NAME, self.owner, POLLER_LEASE_MS):
+                    logger.info(f"Elected as ES poller: {self.owner}")
+                    metrics.set_gauge("stream.is_poller", 1)
+                    poll_task = asyncio.create_task(self.run())
+                    try:
+                        while not poll_task.done():
+                            await asyncio.sleep(POLLER_LEASE_MS / 3000)
+                            if not await self.redis_driver.renew_lock(POLLER_LOCK_NAME, self.owner, POLLER_LEASE_MS):
+                                logger.warning(f"Lost ES poller lease: {self.owner}")
+                                break
+                    finally:
+                        poll_task.cancel()
+                        with suppress(asyncio.CancelledError):
+                            await poll_task
+                        metrics.set_gauge("stream.is_poller", 0)
+
+                await asyncio.sleep(POLLER_LEASE_MS / 2000)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in ES poller election: {e}")
+                await asyncio.sleep(ERROR_RETRY_INTERVAL)
+
+    async def partition_share(self) -> int:
+        """살아 있는 replica 수 기준 공평 분배 몫 ceil(STREAM_PARTITIONS / live_replicas)."""
+        live_replicas = await self.redis_driver.heartbeat_member(REPLICA_MEMBERS_NAME, self.owner, POLLER_LEASE_MS)
+        metrics.set_gauge("stream.live_replicas", live_replicas)
+        share = math.ceil(STREAM_PARTITIONS / max(live_replicas, 1))
+        return min(share, STREAM_MAX_PARTITIONS) if STREAM_MAX_PARTITIONS > 0 else share
+
+    async def run_partition_leases(self):
+        """파티션 lease 를 갱신하고 replica 간 공평 분배 몫에 맞춰 가져오거나 반납.
+
+        몫을 넘는 파티션은 먼저 읽기를 멈추고(draining), 처리 중인 batch 가 끝난 뒤에 lease 를 반납해
+        다른 replica 가 넘겨받을 때 같은 메시지를 동시에 처리하지 않게 한다.
+        """
+        while True:
+            try:
+                share = await self.partition_share()
+
+                for partition in list(self.owned_partitions | self._draining_partitions):
+                    if not await self.redis_driver.renew_lock(f"{PARTITION_LOCK_NAME}:{partition}", self.owner, POLLER_LEASE_MS):
+                        logger.warning(f"Lost stream partition lease {partition}: {self.owner}")
+                        self.owned_partitions.discard(partition)
+                        self._fresh_partitions.discard(partition)
+                        self._draining_partitions.discard(partition)
+
+                while len(self.owned_partitions) > share:
+                    partition = max(self.owned_partitions)
+                    self.owned_partitions.discard(partition)
+                    self._fresh_partitions.discard(partition)
+                    self._draining_partitions.add(partition)
+
+                busy = set().union(*self._busy_partitions.values())
+                for partition in list(self._draining_partitions - busy):
+                    await self.redis_driver.release_lock(f"{PARTITION_LOCK_NAME}:{partition}", self.owner)
+                    self._draining_partitions.discard(partition)
+                    logger.info(f"Released stream partition {partition} to rebalance: {self.owner}")
+
+                for partition in range(STREAM_PARTITIONS):
+                    if len(self.owned_partitions) >= share:
+                        break
+                    if partition in self.owned_partitions or partition in self._draining_partitions:
+                        continue
+                    if await self.redis_driver.acquire_lock(f"{PARTITION_LOCK_NAME}:{partition}", self.owner, POLLER_LEASE_MS):
+                        logger.info(f"Acquired stream partition {partition}: {self.owner}")
+                        self.owned_partitions.add(partition)
+                        self._fresh_partitions.add(partition)
+
+                metrics.set_gauge("stream.owned_partitions", len(self.owned_partitions))
+                await asyncio.sleep(POLLER_LEASE_MS / 3000)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in stream partition leases: {e}")
+                await asyncio.sleep(ERROR_RETRY_INTERVAL)
+
+    async def handle_page(self, logs: list):
+        entries = [
+            (self.stream_for(log["sourceIPAddress"]), {"log": json.dumps(log)})
+            for log in logs
+            if log.get("sourceIPAddress", "unknown") != "unknown"
+        ]
+        await self.redis_driver.stream_add_many(entries, maxlen=STREAM_MAXLEN)
+        metrics.increment("stream.produced", len(entries))
+
+    async def reclaim(self, stream: str, consumer: str, min_idle_ms: int) -> list:
+        """재시도 한도를 넘은 pending 메시지는 dead-letter 로 옮기고 나머지를 이 consumer 로 회수."""
+        dead = await self.redis_driver.stream_dead_letter(
+            stream, STREAM_GROUP, min_idle_ms, STREAM_MAX_DELIVERIES, STREAM_READ_COUNT
+        )
+        if dead:
+            logger.warning(f"Moved {dead} messages to {stream}:dead after {STREAM_MAX_DELIVERIES} deliveries.")
+            metrics.increment("stream.dead_lettered", dead)
+        messages = await self.redis_driver.stream_autoclaim(stream, STREAM_GROUP, consumer, min_idle_ms, STREAM_READ_COUNT)
+        metrics.increment("stream.reclaimed", len(messages))
+        return messages
+
+    async def run_worker(self, index: int):
+        consumer = f"{self.owner}-{index}"
+        groups_ready = False
+        last_claim = 0.0
+        while True:
+            try:
+                if not groups_ready:
+                    for stream in self.streams:
+                        await self.redis_driver.ensure_consumer_group(stream, STREAM_GROUP)
+                    groups_ready = True
+
+                partitions = sorted(p for p in self.owned_partitions if p % STREAM_WORKERS == index)
+                if not partitions:
+                    await asyncio.sleep(STREAM_BLOCK_MS / 1000)
+                    continue
+                streams = [self.streams[partition] for partition in partitions]
+
+                messages = []
+                # 새로 넘겨받은 파티션은 이전 소유자의 pending 을 새 메시지보다 먼저 처리 (IP 내 순서 유지)
+                for partition in partitions:
+                    if partition in self._fresh_partitions:
+                        messages += await self.reclaim(self.streams[partition], consumer, 0)
+                        self._fresh_partitions.discard(partition)
+                if time.monotonic() - last_claim >= STREAM_CLAIM_INTERVAL:
+                    for stream in streams:
+                        messages += await self.reclaim(stream, consumer, STREAM_CLAIM_IDLE_MS)
+                    last_claim = time.monotonic()
+
+                messages += await self.redis_driver.stream_read_group(
+                    STREAM_GROUP, consumer, streams, STREAM_READ_COUNT, STREAM_BLOCK_MS
+                )
+                if not messages:
+                    continue
+
+                logs = [json.loads(fields["log"]) for _, _, fields in messages]
+                # ack 까지 끝나기 전에는 rebalance 로 이 파티션 lease 를 반납하지 않음
+                self._busy_partitions[index] = set(partitions)
+                try:
+                    failed_ips = await self.process_logs(logs, reseed=True)
+
+                    # 처리에 실패한 IP 의 메시지는 ack 하지 않고 pending 으로 남겨 재시도
+                    acks = {}
+                    for (stream, message_id, _), log in zip(messages, logs):
+                        if log.get("sourceIPAddress") not in failed_ips:
+                            acks.setdefault(stream, []).append(message_id)
+                    for stream, message_ids in acks.items():
+                        await self.redis_driver.stream_ack(stream, STREAM_GROUP, message_ids)
+                    metrics.increment("stream.consumed", sum(len(ids) for ids in acks.values()))
+                finally:
+                    self._busy_partitions.pop(index, None)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in stream worker {consumer}: {e}")
+                await asyncio.sleep(ERROR_RETRY_INTERVAL)
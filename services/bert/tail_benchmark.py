@@ -0,0 +1,123 @@
+"""ES tail 조회(search_after) 벤치마크.
+
+임시 인덱스에 같은 @timestamp 를 공유하는 로그 묶음(페이지 크기보다 큼)을 넣고 수집 루프와 같은 방식으로
+끝까지 읽어 중복 / 누락이 없는지, 새 로그 한 건당 조회 비용이 쌓인 로그 수와 무관한지 확인한다.
+비교용으로 조회 하한(gte)을 시작 시점에 고정한 경우도 함께 잰다.
+
+사용법: python -m services.bert.tail_benchmark [--logs 20000] [--same-timestamp 250] [--new-logs 500]
+       python -m services.bert.tail_benchmark --index tail-benchmark --keep
+(ES_HOST / ES_PORT 와 수집기 설정(ES_INDEX 등) 환경 변수가 필요)
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from uuid import uuid4
+from datetime import datetime, timezone, timedelta
+from services.es_service import ElasticsearchService
+from services.bert.ingestion import COMMON_DIR, ES_PAGE_SIZE, fetch_logs_from_elasticsearch
+
+MAPPING_FILE = os.path.join(COMMON_DIR, "elasticsearch_mapping.json")
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def load_mapping():
+    with open(MAPPING_FILE, "r", encoding="utf-8") as file:
+        mapping = json.load(file)
+    mapping["mappings"]["properties"].setdefault("@timestamp", {"type": "date"})
+    return mapping
+
+
+def make_logs(start, count, same_timestamp):
+    """same_timestamp 건씩 같은 @timestamp 를 갖는 로그 count 건."""
+    logs = []
+    for offset in range(start, start + count):
+        timestamp = BASE_TIME + timedelta(seconds=offset // same_timestamp)
+        logs.append({
+            "@timestamp": timestamp.isoformat().replace("+00:00", "Z"),
+            "eventID": str(uuid4()),
+            "eventName": "BenchmarkEvent",
+        })
+    return logs
+
+
+async def index_logs(es_service, index, logs, chunk_size=1000):
+    for start in range(0, len(logs), chunk_size):
+        operations = []
+        for log in logs[start:start + chunk_size]:
+            operations.append({"index": {"_index": index}})
+            operations.append(log)
+        await es_service.es.bulk(operations=operations)
+    await es_service.es.indices.refresh(index=index)
+
+
+async def drain(es_service, index, start_timestamp, sort_key, advance_lower_bound):
+    """수집 루프처럼 빈 페이지가 나올 때까지 조회. (eventID 목록, 페이지별 소요 시간, 하한, 커서) 반환."""
+    event_ids, page_times = [], []
+    while True:
+        started = time.perf_counter()
+        logs, next_sort_key = await fetch_logs_from_elasticsearch(es_service, start_timestamp, sort_key, index=index)
+        page_times.append(time.perf_counter() - started)
+        if not logs:
+            return event_ids, page_times, start_timestamp, sort_key
+        event_ids.extend(log["eventID"] for log in logs)
+        sort_key = next_sort_key
+        if advance_lower_bound:
+            start_timestamp = logs[-1]["@timestamp"]
+
+
+def report(name, event_ids, expected, page_times):
+    duplicates = len(event_ids) - len(set(event_ids))
+    missing = len(expected - set(event_ids))
+    pages = max(1, len(page_times) - 1)  # 마지막 빈 페이지 제외
+    head = page_times[:min(10, pages)]
+    tail = page_times[max(0, pages - 10):pages]
+    print(f"{name:<20} fetched={len(event_ids)} duplicates={duplicates} missing={missing} pages={pages} "
+          f"first_pages={sum(head) / len(head) * 1000:.1f}ms last_pages={sum(tail) / len(tail) * 1000:.1f}ms")
+
+
+async def run(args):
+    es_service = ElasticsearchService()
+    try:
+        await es_service.es.indices.create(index=args.index, body=load_mapping())
+        backlog = make_logs(0, args.logs, args.same_timestamp)
+        await index_logs(es_service, args.index, backlog)
+        print(f"index={args.index} logs={args.logs} same_timestamp={args.same_timestamp} page_size={ES_PAGE_SIZE}")
+
+        initial_timestamp = backlog[0]["@timestamp"]
+        cursors = {}
+        for name, advance in (("advancing_gte", True), ("fixed_gte", False)):
+            event_ids, page_times, start_timestamp, sort_key = await drain(
+                es_service, args.index, initial_timestamp, None, advance
+            )
+            report(name, event_ids, {log["eventID"] for log in backlog}, page_times)
+            cursors[name] = (advance, start_timestamp, sort_key)
+
+        new_logs = make_logs(args.logs, args.new_logs, args.same_timestamp)
+        await index_logs(es_service, args.index, new_logs)
+        for name, (advance, start_timestamp, sort_key) in cursors.items():
+            started = time.perf_counter()
+            event_ids, page_times, _, _ = await drain(es_service, args.index, start_timestamp, sort_key, advance)
+            elapsed = time.perf_counter() - started
+            report(f"{name}+new", event_ids, {log["eventID"] for log in new_logs}, page_times)
+            print(f"{name + '+new':<20} per_new_log={elapsed / max(1, len(event_ids)) * 1e6:.1f}us")
+    finally:
+        if not args.keep:
+            await es_service.es.indices.delete(index=args.index, ignore_unavailable=True)
+        await es_service.close_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", default=f"tail-benchmark-{uuid4().hex[:8]}", help="생성할 임시 인덱스 이름")
+    parser.add_argument("--logs", type=int, default=20000, help="미리 쌓아 둘 로그 수")
+    parser.add_argument("--same-timestamp", type=int, default=ES_PAGE_SIZE * 2 + 50,
+                        help="같은 @timestamp 를 공유하는 로그 수 (페이지 크기보다 크게)")
+    parser.add_argument("--new-logs", type=int, default=500, help="다 읽은 뒤 추가할 새 로그 수")
+    parser.add_argument("--keep", action="store_true", help="끝난 뒤 인덱스를 지우지 않음")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
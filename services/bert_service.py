@@ -1,9 +1,13 @@
 import asyncio
 from fastapi import Depends, HTTPException
 from ai.predict import BERTPredictor
+from ai.model_registry import get_bert_predictor, get_incremental_detector
+from ai.incremental_detector import IncrementalDetector
+from ai.inference_pool import InferenceQueueFullError
 from services.gpt_service import GPTService
 from services.asset_service import AssetService
 from services.policy_service import PolicyService
+from services.bert.prefilter import log_prefilter
 from repositories.prompt_repository import PromptRepository
 from repositories.bert_repository import BertRepository
 from common.logging import setup_logger
@@ -13,8 +17,12 @@ logger = setup_logger()
 
 class BERTService:
     def __init__(self, bert_repository: BertRepository = Depends(), prompt_repository: PromptRepository = Depends(),
-                 asset_service: AssetService = Depends(), gpt_service: GPTService = Depends(), policy_service: PolicyService = Depends()):
-        self.predictor = BERTPredictor()
+                 asset_service: AssetService = Depends(), gpt_service: GPTService = Depends(), policy_service: PolicyService = Depends(),
+                 predictor: BERTPredictor = Depends(get_bert_predictor),
+                 incremental_detector: IncrementalDetector = Depends(get_incremental_detector)):
+        self.predictor = predictor
+        self.incremental_detector = incremental_detector
+        self.prefilter = log_prefilter
         self.asset_service = asset_service
         self.gpt_service = gpt_service
         self.policy_service = policy_service
@@ -74,18 +82,43 @@ class BERTService:
             logger.error(f"Error while creating attack graph: {e}")
             raise HTTPException(status_code=500, detail="Failed to generate attack graph.")
 
-    async def predict_attack(self, log_data: str):
+    async def predict_incremental(self, source_ip: str, new_logs: list, history: list, reseed: bool = False):
+        """새 로그만 추론해 영향받은 (로그, 라벨) 쌍을 도착 순서대로 반환.
+
+        history 는 새 로그까지 반영된 Redis 로그 큐. 처음 보는 IP 면(또는 reseed 면) 그 이전 로그로 상태를 먼저 채움.
+        """
         try:
-            preprocessed_logs = await self.predictor.preprocess_logs(log_data)
-            window_size = 5
-            windowed_logs = await self.predictor.sliding_window(preprocessed_logs, window_size)
-            prediction = await self.predictor.predict(windowed_logs)
-            num_logs = len(preprocessed_logs)
-            final_labels = await self.predictor.consolidate_predictions(prediction, num_logs, window_size)
-            return final_labels
-        
+            if reseed:
+                # 다른 replica 가 같은 IP 를 처리했을 수 있으므로 로컬 상태 대신 Redis 큐 기준으로 재구성
+                self.incremental_detector.forget(source_ip)
+            context = history[:len(history) - len(new_logs)] if len(history) > len(new_logs) else []
+            logs_to_push = new_logs if self.incremental_detector.has_state(source_ip) else context + new_logs
+
+            # allow-list 이벤트로만 이루어진 윈도우: enforce 면 추론하지 않고, shadow 면 추론 결과가 "No Attack" 인지 검증
+            benign = None
+            if self.prefilter.mode != "off":
+                benign = [self.prefilter.is_benign(log) for log in logs_to_push]
+            labels, skippable, window_label_ids = await self.incremental_detector.push(
+                source_ip, logs_to_push, benign, skip_benign=self.prefilter.mode == "enforce"
+            )
+            self.prefilter.record(skippable)
+            if self.prefilter.mode == "shadow" and len(window_label_ids):
+                window_labels = self.predictor.label_encoder.inverse_transform(
+                    window_label_ids.ravel()
+                ).reshape(window_label_ids.shape)
+                self.prefilter.check_shadow(skippable, window_labels)
+
+            affected_logs = context[-(self.incremental_detector.window_size - 1):] + new_logs
+            return list(zip(affected_logs[::-1], labels[::-1]))[::-1]
+
+        except InferenceQueueFullError as e:
+            # 새 로그는 이미 Redis 큐에 들어갔으므로 다음 push 가 Redis 기준으로 상태를 다시 채우도록 버림
+            self.incremental_detector.forget(source_ip)
+            logger.warning(f"Incremental attack prediction rejected: {e}")
+            raise HTTPException(status_code=503, detail="Attack prediction is overloaded. Try again later.")
         except Exception as e:
-            logger.error(f"Error during attack prediction: {e}")
+            self.incremental_detector.forget(source_ip)
+            logger.error(f"Error during incremental attack prediction: {e}")
             raise HTTPException(status_code=500, detail="Failed to predict attack.")
 
     async def process_after_detection(self, user_id: str, attack_info: dict):
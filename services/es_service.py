@@ -70,6 +70,39 @@ class ElasticsearchService:
             raise ElasticsearchServiceError(f"Unexpected error while searching logs: {str(e)}")
 
 
+    async def search_logs_after(self, index, query, sort, search_after=None, size=100, timeout="30s"):
+        """sort 키 기준 search_after 페이지 조회. (문서 목록, 마지막 문서의 sort 값) 반환."""
+        try:
+            timeout = await self._validate_timeout(timeout)
+
+            body = {"size": size, "sort": sort, "query": query}
+            if search_after:
+                body["search_after"] = search_after
+
+            response = await self.es.search(index=index, body=body, request_timeout=timeout)
+            hits = response.get("hits", {}).get("hits", [])
+            return [hit["_source"] for hit in hits], (hits[-1].get("sort") if hits else search_after)
+        except es_exceptions.ConnectionError as e:
+            raise ElasticsearchConnectionError(f"Connection error while searching logs: {str(e)}")
+        except es_exceptions.RequestError as e:
+            raise ElasticsearchRequestError(f"Request error while searching logs: {str(e)}")
+        except Exception as e:
+            raise ElasticsearchServiceError(f"Unexpected error while searching logs: {str(e)}")
+
+    async def count_logs(self, index, query, timeout="10s"):
+        """query 에 맞는 문서 수 조회 (_count, 문서 본문은 가져오지 않음)."""
+        try:
+            timeout = await self._validate_timeout(timeout)
+
+            response = await self.es.count(index=index, body={"query": query}, request_timeout=timeout)
+            return response.get("count", 0)
+        except es_exceptions.ConnectionError as e:
+            raise ElasticsearchConnectionError(f"Connection error while counting logs: {str(e)}")
+        except es_exceptions.RequestError as e:
+            raise ElasticsearchRequestError(f"Request error while counting logs: {str(e)}")
+        except Exception as e:
+            raise ElasticsearchServiceError(f"Unexpected error while counting logs: {str(e)}")
+
     async def save_document(self, index, doc_id, body, overwrite=False, timeout="30s"):
         try:
             timeout = await self._validate_timeout(timeout)